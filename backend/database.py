@@ -1,32 +1,196 @@
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+import threading
+import importlib.util
+import logging
+from collections import deque
+from typing import Dict, Optional
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+MONGO_URI = os.getenv("MONGO_URI")
+DB_NAME = os.getenv("DB_NAME", "ai_therapist")
+
+# Connection pool, per process (multiply by the number of workers for the cluster total)
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+# How long an operation may wait for a free pooled connection before failing
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+# Wire compression in order of preference; the server picks the first it supports.
+# zstd needs the zstandard package and snappy needs python-snappy; codecs whose
+# package is missing are dropped rather than left for PyMongo to warn about.
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+MONGO_COMPRESSORS = ",".join(
+    c for c in (c.strip() for c in os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib").split(","))
+    if c and (c not in COMPRESSOR_MODULES or importlib.util.find_spec(COMPRESSOR_MODULES[c]) is not None)
+)
+
+# Read preference per read workload; writes and read-after-write paths stay on the primary
+READ_PREFERENCES = {
+    "history": os.getenv("MONGO_READ_HISTORY", "primaryPreferred"),
+    "export": os.getenv("MONGO_READ_EXPORT", "secondaryPreferred"),
+    "analytics": os.getenv("MONGO_READ_ANALYTICS", "secondaryPreferred"),
+}
+# Skip secondaries lagging further behind than this (-1 = no limit, otherwise >= 90)
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "-1"))
+
+
+class PoolWaitListener(monitoring.ConnectionPoolListener):
+    """
+    Records how long operations wait to check a connection out of the pool.
+    Callbacks run on driver threads, hence the lock.
+    """
+
+    def __init__(self, window: int = 2048):
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=window)
+        self.checkouts = 0
+        self.failures: Dict[str, int] = {}
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.in_use = 0
+        self.open = 0
+
+    def _record(self, duration: float):
+        self.samples.append(duration)
+        self.total_wait += duration
+        self.max_wait = max(self.max_wait, duration)
+
+    def connection_checked_out(self, event):
+        with self.lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self._record(event.duration)
+
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            self.failures[event.reason] = self.failures.get(event.reason, 0) + 1
+            self._record(event.duration)
+
+    def connection_checked_in(self, event):
+        with self.lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self.lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self.lock:
+            self.open -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            samples = sorted(self.samples)
+            attempts = self.checkouts + sum(self.failures.values())
+
+            def quantile(q: float) -> float:
+                if not samples:
+                    return 0.0
+                return round(samples[min(int(q * len(samples)), len(samples) - 1)] * 1000, 3)
+
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.failures),
+                "connections_open": self.open,
+                "connections_in_use": self.in_use,
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+                "wait_ms": {
+                    "mean": round(self.total_wait / attempts * 1000, 3) if attempts else 0.0,
+                    "p50": quantile(0.5),
+                    "p95": quantile(0.95),
+                    "p99": quantile(0.99),
+                    "max": round(self.max_wait * 1000, 3),
+                },
+            }
+
+
+def make_read_preference(name: str):
+    modes = {
+        "primarypreferred": PrimaryPreferred,
+        "secondary": Secondary,
+        "secondarypreferred": SecondaryPreferred,
+        "nearest": Nearest,
+    }
+    mode = name.replace("_", "").lower()
+    if mode == "primary":
+        return Primary()
+    if mode not in modes:
+        raise ValueError(f"Unknown read preference: {name}")
+    return modes[mode](max_staleness=MONGO_MAX_STALENESS_SECONDS)
+
+
 class Database:
     client: AsyncIOMotorClient = None
+    database: AsyncIOMotorDatabase = None
+    # Handles with a non-default read preference, keyed by workload
+    workloads: Dict[str, AsyncIOMotorDatabase] = {}
+    pool_listener: PoolWaitListener = None
 
 db = Database()
 
 async def connect_to_mongo():
     """Connect to MongoDB Atlas and initialize collections"""
-    MONGO_URI = os.getenv("MONGO_URI")
-    DB_NAME = os.getenv("DB_NAME", "ai_therapist")
-
-    db.client = AsyncIOMotorClient(MONGO_URI)
+    db.pool_listener = PoolWaitListener()
+    db.client = AsyncIOMotorClient(
+        MONGO_URI,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        compressors=MONGO_COMPRESSORS or None,
+        event_listeners=[db.pool_listener],
+    )
     await db.client.admin.command("ping")
 
-    print(f"✅ Connected to MongoDB Atlas - Database: {DB_NAME}")
+    db.database = db.client[DB_NAME]
+    db.workloads = {
+        workload: db.database.with_options(read_preference=make_read_preference(name))
+        for workload, name in READ_PREFERENCES.items()
+    }
+
+    logger.info("Connected to MongoDB Atlas - Database: %s", DB_NAME)
 
-    await init_collections(db.client[DB_NAME])
+    await init_collections(db.database)
 
 
 async def close_mongo_connection():
     """Close MongoDB connection"""
     if db.client:
         db.client.close()
-        print("❌ Closed MongoDB connection")
+        logger.info("Closed MongoDB connection")
 
 
 async def init_collections(database):
@@ -52,7 +216,7 @@ async def init_collections(database):
         await database.create_collection("users", validator=users_validator)
         await database.users.create_index("email", unique=True)
 
-        print("✅ Created 'users' collection with indexes")
+        logger.info("Created 'users' collection with indexes")
 
     # --------------------------
     # MESSAGES COLLECTION
@@ -75,9 +239,64 @@ async def init_collections(database):
         await database.messages.create_index("user_id")
         await database.messages.create_index([("user_id", 1), ("timestamp", -1)])
 
-        print("✅ Created 'messages' collection with indexes")
+        logger.info("Created 'messages' collection with indexes")
+
+    # --------------------------
+    # SESSIONS COLLECTION
+    # --------------------------
+    if "sessions" not in existing:
+        await database.create_collection("sessions")
+        logger.info("Created 'sessions' collection")
+
+    # Serves the per-user session list (create_index is a no-op if present)
+    await database.sessions.create_index([("user_id", 1), ("updated_at", -1)])
+
+    # Session message pages, newest first
+    await database.messages.create_index([("session_id", 1), ("timestamp", -1)])
+
+    # Full-text search scoped to a user (one text index per collection)
+    await database.messages.create_index(
+        [("user_id", 1), ("message", "text")],
+        name="user_message_text",
+        default_language="english",
+    )
+
+    # Daily per-user analytics buckets; also the $merge key for rebuilds
+    await database.user_daily_stats.create_index([("user_id", 1), ("day", 1)], unique=True)
+
+    # Batch transcription jobs and their chunk results
+    await database.transcription_jobs.create_index([("user_id", 1), ("created_at", -1)])
+    await database.transcription_chunks.create_index([("job_id", 1), ("file_index", 1), ("chunk_index", 1)])
+    await database.transcription_chunks.create_index("status")
+
+    # Deferred TTS results only matter for as long as a client may poll them
+    await database.audio_jobs.create_index("created_at", expireAfterSeconds=24 * 3600)
+
+    # Shared rate-limit buckets; an idle bucket has long since refilled
+    await database.rate_limits.create_index("updated_at", expireAfterSeconds=3600)
+
+    # Completed chat turns replayed for retried Idempotency-Keys
+    await database.idempotency_keys.create_index(
+        "created_at",
+        expireAfterSeconds=int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600))),
+    )
+
+    # Audio sweeper looks up stored files by last use
+    await database[f"{os.getenv('AUDIO_GRIDFS_BUCKET', 'audio')}.files"].create_index("metadata.last_used")
+
+    # Compressed cold archives of messages past the retention window
+    await database.message_archives.create_index([("user_id", 1), ("from_ts", 1)])
+
+
+def get_database(workload: Optional[str] = None) -> AsyncIOMotorDatabase:
+    """
+    Database handle cached at startup. ``workload`` ("history", "export",
+    "analytics") selects a handle with that workload's read preference.
+    """
+    if workload is None:
+        return db.database
+    return db.workloads[workload]
 
 
-def get_database():
-    DB_NAME = os.getenv("DB_NAME", "ai_therapist")
-    return db.client[DB_NAME]
+def pool_stats() -> Optional[dict]:
+    return db.pool_listener.snapshot() if db.pool_listener else None
@@ -0,0 +1,23 @@
+"""
+Archive messages older than the retention window.
+
+Run from the backend directory:
+    python -m jobs.archive_messages [days]
+"""
+import sys
+import asyncio
+from database import connect_to_mongo, close_mongo_connection
+from services.retention_service import MESSAGE_RETENTION_DAYS, archive_old_messages
+
+
+async def main(days: int):
+    await connect_to_mongo()
+    try:
+        archived = await archive_old_messages(days)
+        print(f"✅ Archived {archived} messages")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else MESSAGE_RETENTION_DAYS))
@@ -0,0 +1,22 @@
+"""
+Populate message_count / last_message_preview on existing sessions.
+
+Run from the backend directory:
+    python -m jobs.backfill_session_summaries
+"""
+import asyncio
+from database import connect_to_mongo, close_mongo_connection
+from services.sessions_service import backfill_session_summaries
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        updated = await backfill_session_summaries()
+        print(f"✅ Backfilled summaries for {updated} sessions")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+"""
+Rebuild daily analytics buckets from raw messages.
+
+Run from the backend directory:
+    python -m jobs.rebuild_analytics [user_id]
+"""
+import sys
+import asyncio
+from database import connect_to_mongo, close_mongo_connection
+from services.analytics_service import backfill_message_sentiment, rebuild_daily_stats
+
+
+async def main(user_id: str = None):
+    await connect_to_mongo()
+    try:
+        scored = await backfill_message_sentiment()
+        print(f"✅ Scored sentiment for {scored} messages")
+        await rebuild_daily_stats(user_id)
+        print("✅ Rebuilt daily analytics buckets")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else None))
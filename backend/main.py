@@ -1,24 +1,45 @@
-import os
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from routers import user, message, chat_audio, chat_text, session
+from routers import user, message, chat_audio, chat_text, session, audio, analytics, jobs, health, bootstrap
 from database import connect_to_mongo, close_mongo_connection
-from fastapi.staticfiles import StaticFiles
+from middleware.compression import CompressionMiddleware
+from middleware.profiling import ProfilingMiddleware
+from middleware.rate_limit_headers import RateLimitHeadersMiddleware
+from services import transcription_jobs, tts_queue
+from services.retention_service import start_retention_scheduler, stop_retention_scheduler
+from services.loop_monitor import LOOP_LAG_MONITOR, monitor as loop_monitor
+from services.audio_storage import start_audio_sweeper, stop_audio_sweeper
+from services.logging_service import setup_logging
+from middleware.request_id import RequestIDMiddleware
 
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    if LOOP_LAG_MONITOR:
+        loop_monitor.start()
     await connect_to_mongo()
-    print("MongoDB connected ✅")
+    logger.info("MongoDB connected")
+    await transcription_jobs.start_workers()
+    await tts_queue.start_workers()
+    start_retention_scheduler()
+    start_audio_sweeper()
     
     yield
     
     # Shutdown
+    await stop_audio_sweeper()
+    await stop_retention_scheduler()
+    await tts_queue.stop_workers()
+    await transcription_jobs.stop_workers()
     await close_mongo_connection()
-    print("MongoDB connection closed ❌")
+    logger.info("MongoDB connection closed")
+    await loop_monitor.stop()
 
 
 app = FastAPI(title="AI Therapist", lifespan=lifespan)
@@ -29,7 +50,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "Retry-After", "ETag", "Idempotent-Replayed", "X-Profile-File", "X-Request-ID"],
 )
+app.add_middleware(RateLimitHeadersMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Outermost, so a profile covers middleware time as well as the route
+app.add_middleware(ProfilingMiddleware)
+# Outside even the profiler, so every log line of a request carries its ID
+app.add_middleware(RequestIDMiddleware)
 
 # Include routers
 app.include_router(user.router)
@@ -37,8 +65,11 @@ app.include_router(message.router)
 app.include_router(session.router)
 app.include_router(chat_audio.router)
 app.include_router(chat_text.router)
-os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.include_router(audio.router)
+app.include_router(analytics.router)
+app.include_router(jobs.router)
+app.include_router(health.router)
+app.include_router(bootstrap.router)
 
 @app.get("/")
 async def root():
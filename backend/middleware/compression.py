@@ -0,0 +1,33 @@
+import os
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # brotli is optional; gzip covers every client
+    BrotliMiddleware = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Audio is already compressed and must keep exact byte offsets for Range;
+# event streams must not be buffered by an encoder.
+UNCOMPRESSED_PREFIXES = ("/audio",)
+UNCOMPRESSED_SUFFIXES = ("/events",)
+
+
+class CompressionMiddleware:
+    """Brotli/gzip for API responses above a size threshold, skipping audio and SSE."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        if BrotliMiddleware is not None:
+            self.compressed = BrotliMiddleware(app, minimum_size=minimum_size, gzip_fallback=True)
+        else:
+            self.compressed = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path = scope["path"]
+            if not path.startswith(UNCOMPRESSED_PREFIXES) and not path.endswith(UNCOMPRESSED_SUFFIXES):
+                await self.compressed(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,79 @@
+import os
+import re
+import time
+import random
+import asyncio
+import hmac
+import logging
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+except ImportError:  # profiling is opt-in; the app runs without pyinstrument
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+# Requests carrying X-Profile-Token with this value are always profiled
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+# Fraction of all requests to profile (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+# "speedscope" (open at speedscope.app) or "html" (pyinstrument flame view)
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "speedscope").lower()
+
+
+class ProfilingMiddleware:
+    """
+    Runs pyinstrument's sampling profiler for selected requests and writes
+    one profile per request to PROFILE_DIR. The file name is returned in the
+    X-Profile-File response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = Profiler is not None and (PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0)
+        if (PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0) and Profiler is None:
+            logger.warning("Profiling requested but pyinstrument is not installed")
+        if self.enabled:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    def _should_profile(self, scope) -> bool:
+        if PROFILE_TOKEN:
+            for name, value in scope.get("headers", []):
+                if name == b"x-profile-token":
+                    return hmac.compare_digest(value.decode(errors="ignore"), PROFILE_TOKEN)
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        extension = "html" if PROFILE_FORMAT == "html" else "speedscope.json"
+        filename = f"{time.strftime('%Y%m%d_%H%M%S')}_{scope['method']}_{slug}_{random.randrange(1 << 16):04x}.{extension}"
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-file", filename.encode())]
+            await send(message)
+
+        profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            profiler.stop()
+            renderer = HTMLRenderer() if PROFILE_FORMAT == "html" else SpeedscopeRenderer()
+            output = profiler.output(renderer)
+            path = os.path.join(PROFILE_DIR, filename)
+            await asyncio.to_thread(self._write, path, output)
+            logger.info("Profile for %s %s written to %s", scope["method"], scope["path"], path)
+
+    @staticmethod
+    def _write(path: str, output: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(output)
@@ -0,0 +1,32 @@
+class RateLimitHeadersMiddleware:
+    """
+    Adds the RateLimit-* headers recorded by the rate_limit dependency to the
+    response actually sent, whether the handler returned a dict or its own
+    Response (JSONResponse errors, idempotent replays).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # request.state is backed by this dict; creating it here means inner
+        # layers that copy the scope still write into the one we read
+        state = scope.setdefault("state", {})
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = state.get("rate_limit_headers")
+                if headers:
+                    existing = {name.lower() for name, _ in message.get("headers", [])}
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (name.lower().encode(), value.encode())
+                        for name, value in headers.items()
+                        if name.lower().encode() not in existing
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -43,6 +43,8 @@ class SessionInDB(BaseModel):
     created_at: str
     updated_at: str
     is_active: bool = True
+    message_count: int = 0
+    last_message_preview: Optional[str] = None
 
     class Config:
         populate_by_name = True
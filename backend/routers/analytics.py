@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Query
+from schemas.analytics import DailyStats, UserAnalyticsResponse
+from services.analytics_service import get_user_daily_stats
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+@router.get("/user/{user_id}", response_model=UserAnalyticsResponse)
+async def user_analytics(user_id: str, days: int = Query(30, ge=1, le=365)):
+    """Per-day engagement and mood trends, read from precomputed buckets only."""
+    buckets = await get_user_daily_stats(user_id, days)
+    daily = []
+    for b in buckets:
+        sentiment_count = b.get("sentiment_count", 0)
+        latency_count = b.get("latency_count", 0)
+        daily.append(DailyStats(
+            day=b["day"],
+            messages=b.get("messages", 0),
+            user_messages=b.get("user_messages", 0),
+            assistant_messages=b.get("assistant_messages", 0),
+            session_count=len(b.get("sessions", [])),
+            session_minutes=round(b.get("session_seconds", 0) / 60, 1),
+            avg_sentiment=round(b["sentiment_sum"] / sentiment_count, 3) if sentiment_count else None,
+            avg_response_latency_ms=round(b["latency_sum_ms"] / latency_count, 1) if latency_count else None,
+        ))
+    return UserAnalyticsResponse(user_id=user_id, days=days, daily=daily)
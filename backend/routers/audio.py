@@ -0,0 +1,156 @@
+import os
+import json
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from services.audio_storage import (
+    AUDIO_VARIANTS,
+    get_audio_storage,
+    get_or_create_variant,
+)
+from services.tts_queue import PENDING, wait_for_audio
+from services.http_cache import etag_matches
+
+router = APIRouter(prefix="/audio", tags=["Audio"])
+
+# Names are content hashes, so a URL never changes meaning and can be cached forever
+AUDIO_CACHE_CONTROL = os.getenv("AUDIO_CACHE_CONTROL", "private, max-age=31536000, immutable")
+
+
+def negotiate_variant(accept: str, save_data: str) -> Optional[str]:
+    """Pick a smaller rendition when the client explicitly accepts one."""
+    for part in accept.split(","):
+        fields = [f.strip() for f in part.split(";")]
+        media_type = fields[0].lower()
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type in ("audio/ogg", "audio/opus") and q > 0 and "opus" in AUDIO_VARIANTS:
+            return "opus"
+    if save_data.lower() == "on" and "low" in AUDIO_VARIANTS:
+        return "low"
+    return None
+
+
+def parse_range(header: str, length: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range. Returns None to serve the whole file
+    (including for malformed headers, which RFC 9110 lets us ignore) and
+    raises ValueError when a well-formed range cannot be satisfied.
+    """
+    if not header.startswith("bytes=") or "," in header:
+        return None
+    start_str, sep, end_str = header[len("bytes="):].strip().partition("-")
+    if not sep or not (start_str.isdigit() or start_str == "") or not (end_str.isdigit() or end_str == ""):
+        return None
+    if start_str == "":
+        if end_str == "":
+            return None
+        suffix = int(end_str)
+        if suffix == 0 or length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(length - suffix, 0), length - 1
+    start = int(start_str)
+    if end_str and int(end_str) < start:
+        return None
+    end = int(end_str) if end_str else length - 1
+    if start >= length:
+        raise ValueError("Unsatisfiable range")
+    return start, min(end, length - 1)
+
+
+def audio_job_payload(job: dict) -> dict:
+    return {
+        "audio_id": job["_id"],
+        "status": job["status"],
+        "audio_url": job.get("audio_url"),
+        "error": job.get("error"),
+    }
+
+
+@router.get("/jobs/{audio_id}")
+async def get_audio_job_status(audio_id: str, wait: float = Query(25, ge=0, le=60)):
+    """Long-poll a deferred reply: returns as soon as the audio is ready or ``wait`` expires."""
+    job = await wait_for_audio(audio_id, wait)
+    if not job:
+        raise HTTPException(status_code=404, detail="Audio job not found")
+    return audio_job_payload(job)
+
+
+@router.get("/jobs/{audio_id}/events")
+async def stream_audio_job_status(audio_id: str):
+    """Server-sent event carrying the audio URL once synthesis finishes."""
+    job = await wait_for_audio(audio_id, 0)
+    if not job:
+        raise HTTPException(status_code=404, detail="Audio job not found")
+
+    async def events():
+        current = job
+        while current and current["status"] == PENDING:
+            # Comment line keeps proxies from closing an idle stream
+            yield ": waiting\n\n"
+            current = await wait_for_audio(audio_id, 15)
+        if current:
+            yield f"event: {current['status']}\ndata: {json.dumps(audio_job_payload(current))}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.api_route("/{name}", methods=["GET", "HEAD"])
+async def get_audio(name: str, request: Request):
+    """Stream a generated audio reply with caching, Range and variant support."""
+    storage = get_audio_storage()
+    try:
+        stored = await storage.stat(name)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    if not stored:
+        raise HTTPException(status_code=404, detail="Audio not found")
+
+    variant = negotiate_variant(request.headers.get("accept", ""), request.headers.get("save-data", ""))
+    if variant:
+        stored = await get_or_create_variant(name, variant) or stored
+
+    etag = f'"{stored.name}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": AUDIO_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept, Save-Data",
+    }
+
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, stored.length)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{stored.length}"
+            return Response(status_code=416, headers=headers)
+
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{stored.length}"
+    else:
+        start, end = 0, stored.length - 1
+        status_code = 200
+    headers["Content-Length"] = str(end - start + 1)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=stored.content_type)
+
+    return StreamingResponse(
+        storage.open_range(stored.name, start, end),
+        status_code=status_code,
+        media_type=stored.content_type,
+        headers=headers,
+    )
@@ -0,0 +1,57 @@
+import asyncio
+from fastapi import APIRouter, Query
+from schemas.bootstrap import BootstrapResponse
+from schemas.message import MessageResponse
+from schemas.session import SessionResponse
+from services.sessions_service import get_user_sessions, get_latest_session
+from services.messages_service import get_session_messages_page
+
+router = APIRouter(prefix="/bootstrap", tags=["Bootstrap"])
+
+
+async def latest_session_page(user_id: str, limit: int):
+    """Most recent session and its last page (one extra message to detect more)."""
+    session = await get_latest_session(user_id)
+    if not session:
+        return None, []
+    return session, await get_session_messages_page(str(session.id), limit + 1)
+
+
+@router.get("/{user_id}", response_model=BootstrapResponse)
+async def bootstrap(user_id: str, limit: int = Query(50, ge=1, le=200)):
+    """Everything the app needs on login, read concurrently in one round trip."""
+    sessions, (active, page) = await asyncio.gather(
+        get_user_sessions(user_id),
+        latest_session_page(user_id, limit),
+    )
+    has_more = len(page) > limit
+    page = page[-limit:]
+
+    return BootstrapResponse(
+        sessions=[
+            SessionResponse(
+                id=str(s.id),
+                user_id=s.user_id,
+                title=s.title,
+                created_at=s.created_at,
+                updated_at=s.updated_at,
+                is_active=s.is_active,
+                message_count=s.message_count,
+                last_message_preview=s.last_message_preview,
+            )
+            for s in sessions
+        ],
+        active_session_id=str(active.id) if active else None,
+        messages=[
+            MessageResponse(
+                id=str(m.id),
+                user_id=m.user_id,
+                sender=m.sender,
+                message=m.message,
+                session_id=m.session_id,
+                timestamp=m.timestamp
+            )
+            for m in page
+        ],
+        has_more_messages=has_more,
+    )
@@ -1,16 +1,26 @@
 import os
 import asyncio
+import tempfile
+import logging
+from functools import partial
 from typing import Optional
-from fastapi import APIRouter, UploadFile, File, Form, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Form, Depends, Header
 from fastapi.responses import JSONResponse
-import whisper
 from services.messages_service import save_message
 from services.ai_service import get_gemini_response, generate_speech
 from services.sessions_service import update_session_title_from_message
+from services.audio_storage import build_audio_url
+from services.stt_service import get_model, transcribe
+from services.rate_limiter import rate_limit
+from services.idempotency_service import run_idempotent
+from services.memory_service import recall_memories
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["Audio"])
 
-model = whisper.load_model("tiny")
+# Load the model at import so the first request (and serve.py's preload) doesn't pay for it
+get_model()
 
 
 def delete_file(file_path: str):
@@ -18,50 +28,44 @@ def delete_file(file_path: str):
     try:
         if os.path.exists(file_path):
             os.remove(file_path)
-            print(f"Deleted file: {file_path}")
+            logger.info("Deleted file: %s", file_path, extra={"event": "file_deleted"})
     except Exception as e:
-        print(f"Error deleting file {file_path}: {e}")
-
-
-def estimate_audio_duration(text: str) -> int:
-    """
-    Estimate audio duration based on text length.
-    Average speaking rate is ~150 words per minute (~2.5 words per second).
-    """
-    word_count = len(text.split())
-    duration_seconds = word_count / 2.5
-    return int(duration_seconds)
+        logger.warning("Error deleting file %s: %s", file_path, e)
 
 
-def delete_file_after_playback(file_path: str, text: str, buffer_seconds: int = 30):
-    """Delete a file after estimated playback time + buffer."""
-    import time
-    
-    audio_duration = estimate_audio_duration(text)
-    total_delay = audio_duration + buffer_seconds
-    
-    print(f"Audio duration: ~{audio_duration}s, deleting in {total_delay}s")
-    time.sleep(total_delay)
-    delete_file(file_path)
-
-
-@router.post("/audio")
+@router.post("/audio", dependencies=[Depends(rate_limit("chat_audio", "chat_audio"))])
 async def chat_audio(
-    background_tasks: BackgroundTasks,
     user_id: str = Form(...), 
     file: UploadFile = File(...),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None)
 ):
-    audio_path = "input.wav"
-    with open(audio_path, "wb") as f:
-        f.write(await file.read())
-
-    result = model.transcribe(audio_path)
+    """Audio chat turn. Retries with the same Idempotency-Key replay the first result."""
+    return await run_idempotent(
+        idempotency_key,
+        "chat_audio",
+        user_id,
+        partial(audio_turn, user_id, file, session_id),
+    )
+
+
+async def audio_turn(
+    user_id: str,
+    file: UploadFile,
+    session_id: Optional[str]
+):
+    # One file per request: workers share a cwd, so a fixed name would race
+    suffix = os.path.splitext(file.filename or "")[1] or ".wav"
+    fd, audio_path = tempfile.mkstemp(prefix="chat_audio_", suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(await file.read())
+        result = await asyncio.to_thread(transcribe, audio_path)
+    finally:
+        # Delete input audio file after transcription
+        delete_file(audio_path)
     user_input = result["text"].strip()
 
-    # Delete input audio file after transcription
-    delete_file(audio_path)
-
     if not user_input:
         return JSONResponse({"error": "No speech detected"}, 400)
 
@@ -71,20 +75,16 @@ async def chat_audio(
     if session_id:
         await update_session_title_from_message(session_id, user_input)
 
-    ai_response = get_gemini_response(user_input)
+    memories = await recall_memories(user_id, user_input, exclude_session_id=session_id)
+    ai_response = get_gemini_response(user_input, memories)
     await save_message(user_id, "assistant", ai_response, session_id)
 
-    audio_output = await generate_speech(ai_response)
-
-    # Extract only filename
-    filename = audio_output.split("/")[-1]
-
-    # Schedule deletion of output audio file after playback completes + 30 seconds buffer
-    background_tasks.add_task(delete_file_after_playback, audio_output, ai_response, 30)
+    # Unused audio is removed by the sweeper after AUDIO_TTL_SECONDS
+    audio_name = await generate_speech(ai_response)
 
     return {
         "message": user_input,
         "response": ai_response,
         "session_id": session_id,
-        "audio_url": f"http://127.0.0.1:8000/{filename}"
+        "audio_url": build_audio_url(audio_name)
     }
\ No newline at end of file
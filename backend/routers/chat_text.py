@@ -1,52 +1,36 @@
-import os
-import time
+from functools import partial
 from typing import Optional
-from fastapi import APIRouter, Form, BackgroundTasks
+from fastapi import APIRouter, Form, Depends, Header
 from fastapi.responses import JSONResponse
 from services.messages_service import save_message
 from services.ai_service import get_gemini_response, generate_speech
 from services.sessions_service import update_session_title_from_message
+from services.audio_storage import PUBLIC_BASE_URL, build_audio_url
+from services.tts_queue import enqueue_speech
+from services.rate_limiter import rate_limit
+from services.idempotency_service import run_idempotent
+from services.memory_service import recall_memories
 
 router = APIRouter(prefix="/chat", tags=["Text"])
 
 
-def delete_file(file_path: str):
-    """Delete a file if it exists."""
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            print(f"Deleted file: {file_path}")
-    except Exception as e:
-        print(f"Error deleting file {file_path}: {e}")
-
-
-def estimate_audio_duration(text: str) -> int:
-    """
-    Estimate audio duration based on text length.
-    Average speaking rate is ~150 words per minute (~2.5 words per second).
-    """
-    word_count = len(text.split())
-    duration_seconds = word_count / 2.5
-    return int(duration_seconds)
-
-
-def delete_file_after_playback(file_path: str, text: str, buffer_seconds: int = 30):
-    """Delete a file after estimated playback time + buffer."""
-    audio_duration = estimate_audio_duration(text)
-    total_delay = audio_duration + buffer_seconds
-    
-    print(f"Audio duration: ~{audio_duration}s, deleting in {total_delay}s")
-    time.sleep(total_delay)
-    delete_file(file_path)
-
-
-@router.post("/text")
+@router.post("/text", dependencies=[Depends(rate_limit("chat_text", "chat_text"))])
 async def chat_text(
     user_id: str = Form(...), 
     input_text: str = Form(...),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """Text-only chat endpoint - no audio generation."""
+    return await run_idempotent(
+        idempotency_key,
+        "chat_text",
+        user_id,
+        partial(text_turn, user_id, input_text, session_id),
+    )
+
+
+async def text_turn(user_id: str, input_text: str, session_id: Optional[str]):
     input_text = input_text.strip()
 
     if not input_text:
@@ -58,7 +42,8 @@ async def chat_text(
     if session_id:
         await update_session_title_from_message(session_id, input_text)
 
-    ai_response = get_gemini_response(input_text)
+    memories = await recall_memories(user_id, input_text, exclude_session_id=session_id)
+    ai_response = get_gemini_response(input_text, memories)
     await save_message(user_id, "assistant", ai_response, session_id)
 
     return {
@@ -68,14 +53,33 @@ async def chat_text(
     }
 
 
-@router.post("/text-with-audio")
+@router.post("/text-with-audio", dependencies=[Depends(rate_limit("chat_text", "chat_text_with_audio"))])
 async def chat_text_with_audio(
-    background_tasks: BackgroundTasks,
     user_id: str = Form(...), 
     input_text: str = Form(...),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    deferred_audio: bool = Form(False),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Text chat endpoint with audio response.
+    With deferred_audio the text comes back immediately together with an
+    audio_id; the audio URL is then fetched from /audio/jobs/{audio_id}.
+    """
+    return await run_idempotent(
+        idempotency_key,
+        "chat_text_with_audio",
+        user_id,
+        partial(text_with_audio_turn, user_id, input_text, session_id, deferred_audio),
+    )
+
+
+async def text_with_audio_turn(
+    user_id: str,
+    input_text: str,
+    session_id: Optional[str],
+    deferred_audio: bool
 ):
-    """Text chat endpoint with audio response."""
     input_text = input_text.strip()
 
     if not input_text:
@@ -87,20 +91,26 @@ async def chat_text_with_audio(
     if session_id:
         await update_session_title_from_message(session_id, input_text)
 
-    ai_response = get_gemini_response(input_text)
+    memories = await recall_memories(user_id, input_text, exclude_session_id=session_id)
+    ai_response = get_gemini_response(input_text, memories)
     await save_message(user_id, "assistant", ai_response, session_id)
 
-    audio_output = await generate_speech(ai_response)
-    
-    # Extract only filename
-    filename = audio_output.split("/")[-1]
+    if deferred_audio:
+        audio_id = await enqueue_speech(ai_response)
+        return {
+            "message": input_text,
+            "response": ai_response,
+            "session_id": session_id,
+            "audio_id": audio_id,
+            "audio_status_url": f"{PUBLIC_BASE_URL}/audio/jobs/{audio_id}"
+        }
 
-    # Schedule deletion of output audio file after playback completes + 30 seconds buffer
-    background_tasks.add_task(delete_file_after_playback, audio_output, ai_response, 30)
+    # Unused audio is removed by the sweeper after AUDIO_TTL_SECONDS
+    audio_name = await generate_speech(ai_response)
 
     return {
         "message": input_text,
         "response": ai_response,
         "session_id": session_id,
-        "audio_url": f"http://127.0.0.1:8000/{filename}"
+        "audio_url": build_audio_url(audio_name)
     }
\ No newline at end of file
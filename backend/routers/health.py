@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from database import pool_stats
+from services.circuit_breaker import breaker_snapshots
+from services.loop_monitor import monitor as loop_monitor
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/tts")
+async def tts_health():
+    """Circuit breaker state and transition counts for each TTS provider."""
+    return {"breakers": [b for b in breaker_snapshots() if b["name"].startswith("tts:")]}
+
+
+@router.get("/loop")
+async def loop_health():
+    """Event loop stalls seen by the lag monitor, with the last blocking stack."""
+    return loop_monitor.snapshot()
+
+
+@router.get("/mongo")
+async def mongo_health():
+    """Connection pool usage and how long operations waited for a connection."""
+    return {"pool": pool_stats()}
@@ -0,0 +1,97 @@
+import os
+import json
+import asyncio
+from typing import List
+from bson import ObjectId
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status
+from fastapi.responses import StreamingResponse
+from schemas.job import JobChunk, JobFile, TranscriptionJobResponse
+from services.transcription_jobs import (
+    TERMINAL_STATUSES,
+    create_job,
+    get_job,
+    get_job_chunks,
+    job_dir,
+    job_throughput,
+)
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def to_response(job: dict, chunks: List[dict] = None) -> TranscriptionJobResponse:
+    throughput = job_throughput(job)
+    return TranscriptionJobResponse(
+        id=str(job["_id"]),
+        user_id=job["user_id"],
+        status=job["status"],
+        files=[JobFile(**f) for f in job["files"]],
+        chunks_total=job["chunks_total"],
+        chunks_done=job["chunks_done"],
+        chunks_failed=job["chunks_failed"],
+        audio_seconds_total=job["audio_seconds_total"],
+        audio_seconds_done=job["audio_seconds_done"],
+        audio_minutes_per_wall_minute=round(throughput, 2) if throughput is not None else None,
+        created_at=job["created_at"].isoformat(),
+        started_at=job["started_at"].isoformat() if job.get("started_at") else None,
+        finished_at=job["finished_at"].isoformat() if job.get("finished_at") else None,
+        chunks=[JobChunk(**c) for c in chunks] if chunks is not None else None,
+    )
+
+
+@router.post("/transcribe", response_model=TranscriptionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_transcription_job(
+    user_id: str = Form(...),
+    files: List[UploadFile] = File(...),
+):
+    """Queue many recordings (or one long one) for chunked background transcription."""
+    job_id = str(ObjectId())
+    directory = job_dir(job_id)
+    os.makedirs(directory, exist_ok=True)
+
+    saved = []
+    for index, upload in enumerate(files):
+        path = os.path.join(directory, f"{index}_{os.path.basename(upload.filename or 'audio')}")
+        with open(path, "wb") as f:
+            while data := await upload.read(UPLOAD_CHUNK_SIZE):
+                f.write(data)
+        saved.append({"filename": upload.filename or f"file_{index}", "path": path})
+
+    job = await create_job(job_id, user_id, saved)
+    return to_response(job)
+
+
+@router.get("/{job_id}", response_model=TranscriptionJobResponse)
+async def get_transcription_job(job_id: str, include_chunks: bool = False):
+    """Poll job progress; chunk-level results are included on request."""
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    chunks = await get_job_chunks(job_id) if include_chunks else None
+    return to_response(job, chunks)
+
+
+@router.get("/{job_id}/events")
+async def stream_transcription_job(job_id: str):
+    """Server-sent progress events until the job reaches a terminal state."""
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last = None
+        while True:
+            job = await get_job(job_id)
+            if job is None:
+                return
+            payload = to_response(job).model_dump_json()
+            if payload != last:
+                yield f"event: progress\ndata: {payload}\n\n"
+                last = payload
+            if job["status"] in TERMINAL_STATUSES:
+                yield f"event: done\ndata: {json.dumps({'status': job['status']})}\n\n"
+                return
+            await asyncio.sleep(1)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -1,7 +1,18 @@
-from fastapi import APIRouter, Form
+import json
+from fastapi import APIRouter, Form, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import Optional
-from schemas.message import MessageResponse
-from services.messages_service import save_message, get_chat_history, get_session_messages
+from schemas.message import MessageResponse, MessageSearchHit, MessageSearchResponse
+from services.messages_service import (
+    save_message,
+    get_chat_history,
+    get_session_messages,
+    search_messages,
+    build_snippet,
+)
+from services.sessions_service import get_session_messages_etag
+from services.http_cache import etag_matches
+from services.retention_service import iter_user_messages
 
 router = APIRouter(prefix="/messages", tags=["Messages"])
 
@@ -20,10 +31,60 @@ async def history(user_id: str, session_id: Optional[str] = None):
         for m in history
     ]
 
+@router.get("/search", response_model=MessageSearchResponse)
+async def search(
+    user_id: str,
+    q: str = Query(..., min_length=1, max_length=200),
+    session_id: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+):
+    """Ranked full-text search over a user's conversations."""
+    # Fetch one extra hit to know whether another page exists
+    hits = await search_messages(user_id, q, session_id, (page - 1) * page_size, page_size + 1)
+    has_more = len(hits) > page_size
+
+    results = []
+    for m, score in hits[:page_size]:
+        snippet, highlights = build_snippet(m.message, q)
+        results.append(MessageSearchHit(
+            id=str(m.id),
+            user_id=m.user_id,
+            sender=m.sender,
+            message=m.message,
+            session_id=m.session_id,
+            timestamp=m.timestamp,
+            score=score,
+            snippet=snippet,
+            highlights=highlights,
+        ))
+
+    return MessageSearchResponse(query=q, page=page, page_size=page_size, has_more=has_more, results=results)
+
+@router.get("/export/{user_id}")
+async def export(user_id: str, include_archived: bool = True):
+    """Stream a user's full history as NDJSON, rehydrating archived messages."""
+    async def lines():
+        async for msg in iter_user_messages(user_id, include_archived):
+            yield json.dumps(msg, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="messages_{user_id}.ndjson"'},
+    )
+
 @router.get("/session/{session_id}", response_model=list[MessageResponse])
-async def session_messages(session_id: str):
-    """Get all messages for a specific session."""
+async def session_messages(session_id: str, request: Request, response: Response):
+    """Get all messages for a specific session (answers 304 when unchanged)."""
+    etag = await get_session_messages_etag(session_id)
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
     history = await get_session_messages(session_id)
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
     return [
         MessageResponse(
             id=str(m.id),
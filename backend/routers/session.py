@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, status, Body
+from fastapi import APIRouter, HTTPException, status, Body, Request, Response
 from typing import List, Optional
 from pydantic import BaseModel
 from schemas.session import SessionCreate, SessionResponse, SessionUpdate
@@ -8,7 +8,9 @@ from services.sessions_service import (
     get_session_by_id,
     update_session,
     delete_session,
+    get_user_sessions_etag,
 )
+from services.http_cache import etag_matches
 
 router = APIRouter(prefix="/sessions", tags=["Sessions"])
 
@@ -34,13 +36,21 @@ async def create_session_endpoint(request: CreateSessionRequest):
         created_at=session.created_at,
         updated_at=session.updated_at,
         is_active=session.is_active,
+        message_count=session.message_count,
+        last_message_preview=session.last_message_preview,
     )
 
 
 @router.get("/user/{user_id}", response_model=List[SessionResponse])
-async def get_user_sessions_endpoint(user_id: str):
-    """Get all sessions for a user."""
+async def get_user_sessions_endpoint(user_id: str, request: Request, response: Response):
+    """Get all sessions for a user (answers 304 when the list is unchanged)."""
+    etag = await get_user_sessions_etag(user_id)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
     sessions = await get_user_sessions(user_id)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
     return [
         SessionResponse(
             id=str(s.id),
@@ -49,6 +59,8 @@ async def get_user_sessions_endpoint(user_id: str):
             created_at=s.created_at,
             updated_at=s.updated_at,
             is_active=s.is_active,
+            message_count=s.message_count,
+            last_message_preview=s.last_message_preview,
         )
         for s in sessions
     ]
@@ -67,6 +79,8 @@ async def get_session_endpoint(session_id: str):
         created_at=session.created_at,
         updated_at=session.updated_at,
         is_active=session.is_active,
+        message_count=session.message_count,
+        last_message_preview=session.last_message_preview,
     )
 
 
@@ -96,6 +110,8 @@ async def update_session_endpoint(
         created_at=updated.created_at,
         updated_at=updated.updated_at,
         is_active=updated.is_active,
+        message_count=updated.message_count,
+        last_message_preview=updated.last_message_preview,
     )
 
 
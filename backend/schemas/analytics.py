@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class DailyStats(BaseModel):
+    day: str
+    messages: int
+    user_messages: int
+    assistant_messages: int
+    session_count: int
+    session_minutes: float
+    avg_sentiment: Optional[float] = None
+    avg_response_latency_ms: Optional[float] = None
+
+
+class UserAnalyticsResponse(BaseModel):
+    user_id: str
+    days: int
+    daily: List[DailyStats]
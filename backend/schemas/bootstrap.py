@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from schemas.message import MessageResponse
+from schemas.session import SessionResponse
+
+
+class BootstrapResponse(BaseModel):
+    sessions: List[SessionResponse]
+    active_session_id: Optional[str] = None
+    messages: List[MessageResponse]
+    has_more_messages: bool = False
@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class JobFile(BaseModel):
+    filename: str
+    duration: float
+    transcript: Optional[str] = None
+    error: Optional[str] = None
+
+
+class JobChunk(BaseModel):
+    file_index: int
+    chunk_index: int
+    start: float
+    duration: float
+    status: str
+    text: Optional[str] = None
+
+
+class TranscriptionJobResponse(BaseModel):
+    id: str
+    user_id: str
+    status: str
+    files: List[JobFile]
+    chunks_total: int
+    chunks_done: int
+    chunks_failed: int
+    audio_seconds_total: float
+    audio_seconds_done: float
+    audio_minutes_per_wall_minute: Optional[float] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    chunks: Optional[List[JobChunk]] = None
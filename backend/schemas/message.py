@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class MessageCreate(BaseModel):
     user_id: str
@@ -17,3 +17,17 @@ class MessageResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class MessageSearchHit(MessageResponse):
+    score: float
+    snippet: str
+    highlights: List[List[int]] = []
+
+
+class MessageSearchResponse(BaseModel):
+    query: str
+    page: int
+    page_size: int
+    has_more: bool
+    results: List[MessageSearchHit]
@@ -19,3 +19,5 @@ class SessionResponse(BaseModel):
     created_at: str
     updated_at: str
     is_active: bool
+    message_count: int = 0
+    last_message_preview: Optional[str] = None
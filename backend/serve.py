@@ -0,0 +1,254 @@
+"""
+Production launcher: ``python serve.py --workers 4``
+
+The master imports the app and loads the Whisper model once, then forks
+workers that share those pages copy-on-write and accept on one listening
+socket. Each worker runs the app lifespan itself, so Mongo clients, queues
+and background tasks are created after fork.
+
+Signals (to the master):
+  HUP      graceful reload: re-exec the master with new code, start new
+           workers, then drain the old ones
+  USR1     log per-worker memory now
+  TERM/INT graceful shutdown
+"""
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+from typing import Dict, List, Optional
+
+from services.logging_service import setup_logging, stop_logging
+
+logger = logging.getLogger("serve")
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "2"))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+# Seconds a worker may spend finishing in-flight requests before it is killed
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+MEMORY_REPORT_SECONDS = int(os.getenv("MEMORY_REPORT_SECONDS", "300"))
+# Set across a reload's exec so the new master keeps the socket and knows the old workers
+LISTEN_FD_ENV = "SERVE_LISTEN_FD"
+OLD_WORKERS_ENV = "SERVE_OLD_WORKERS"
+
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_memory(pid: int) -> Optional[Dict[str, int]]:
+    """Memory of ``pid`` in kB from /proc/<pid>/smaps_rollup (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    stats = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        if key in SMAPS_FIELDS:
+            stats[key] = int(value.split()[0])
+    return stats
+
+
+def report_memory(workers: List[int]) -> None:
+    """Private memory is what each extra worker really costs; Pss splits shared pages fairly."""
+    for label, pid in [("master", os.getpid())] + [("worker", p) for p in workers]:
+        stats = read_memory(pid)
+        if not stats:
+            continue
+        private = stats.get("Private_Clean", 0) + stats.get("Private_Dirty", 0)
+        shared = stats.get("Shared_Clean", 0) + stats.get("Shared_Dirty", 0)
+        logger.info(
+            "%s %d: rss=%dMB pss=%dMB shared=%dMB private=%dMB",
+            label, pid, stats.get("Rss", 0) // 1024, stats.get("Pss", 0) // 1024, shared // 1024, private // 1024,
+            extra={"event": "worker_memory", "pid": pid, **{k.lower(): v for k, v in stats.items()}},
+        )
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    inherited = os.environ.pop(LISTEN_FD_ENV, None)
+    if inherited:
+        return socket.socket(fileno=int(inherited))
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def preload():
+    """Import the app and everything heavy before forking."""
+    from services.stt_service import get_model
+    from main import app
+
+    get_model()
+    # Objects that exist now live as long as the workers do; keeping the
+    # collector off them stops it dirtying (and so copying) shared pages.
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+class Master:
+    def __init__(self, app, sock: socket.socket, workers: int, args):
+        self.app = app
+        self.sock = sock
+        self.size = workers
+        self.args = args
+        self.workers: List[int] = []
+        self.draining: Dict[int, float] = {}
+        self.signals: List[int] = []
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.workers.append(pid)
+            return
+        # Worker: uvicorn installs its own TERM/INT handlers
+        for sig in (signal.SIGHUP, signal.SIGUSR1, signal.SIGCHLD, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_DFL)
+        try:
+            import uvicorn
+
+            config = uvicorn.Config(
+                self.app,
+                lifespan="on",
+                log_level=self.args.log_level,
+                # Let uvicorn's loggers propagate into the app's queue/JSON pipeline
+                log_config=None,
+                # RequestIDMiddleware logs each request with its ID and duration
+                access_log=False,
+                proxy_headers=True,
+                forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+                timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+            )
+            uvicorn.Server(config).run(sockets=[self.sock])
+        finally:
+            stop_logging()
+            os._exit(0)
+
+    def drain(self, pids: List[int]) -> None:
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT + 5
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                continue
+            self.draining[pid] = deadline
+
+    def reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.draining:
+                self.draining.pop(pid)
+            elif pid in self.workers:
+                self.workers.remove(pid)
+                logger.warning("worker %d exited with status %d", pid, status)
+
+    def reload(self) -> None:
+        """Re-exec in place (same pid, so the workers stay our children) with the socket kept open."""
+        logger.info("reloading")
+        self.sock.set_inheritable(True)
+        os.environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        os.environ[OLD_WORKERS_ENV] = ",".join(str(p) for p in self.workers + list(self.draining))
+        stop_logging()
+        os.execv(sys.executable, [sys.executable] + sys.orig_argv[1:])
+
+    def run(self) -> None:
+        for sig in (signal.SIGHUP, signal.SIGUSR1, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: self.signals.append(signum))
+
+        old = [int(p) for p in os.environ.pop(OLD_WORKERS_ENV, "").split(",") if p]
+        if self.app is None:
+            # The new code failed to load: keep serving with the old workers
+            self.workers = old
+        else:
+            while len(self.workers) < self.size:
+                self.spawn()
+            self.drain(old)
+        logger.info("master %d running %d workers on %s", os.getpid(), len(self.workers), self.sock.getsockname())
+
+        next_report = time.monotonic() + MEMORY_REPORT_SECONDS
+        while True:
+            time.sleep(0.5)
+            self.reap()
+            while self.signals:
+                sig = self.signals.pop(0)
+                if sig == signal.SIGHUP:
+                    self.reload()
+                elif sig == signal.SIGUSR1:
+                    report_memory(self.workers)
+                else:
+                    self.shutdown()
+                    return
+
+            now = time.monotonic()
+            for pid, deadline in list(self.draining.items()):
+                if now > deadline:
+                    logger.warning("worker %d did not drain in time, killing", pid)
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    self.draining[pid] = float("inf")
+            if self.app is not None:
+                while len(self.workers) < self.size:
+                    self.spawn()
+            if MEMORY_REPORT_SECONDS > 0 and now >= next_report:
+                report_memory(self.workers)
+                next_report = now + MEMORY_REPORT_SECONDS
+
+    def shutdown(self) -> None:
+        logger.info("shutting down")
+        self.drain(self.workers)
+        self.workers = []
+        while self.draining:
+            time.sleep(0.2)
+            self.reap()
+            now = time.monotonic()
+            for pid, deadline in list(self.draining.items()):
+                if now > deadline:
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    self.draining[pid] = float("inf")
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with preloaded, forked workers")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info").lower())
+    args = parser.parse_args()
+    setup_logging()
+
+    reloading = OLD_WORKERS_ENV in os.environ
+    sock = bind_socket(args.host, args.port)
+    sock.set_inheritable(False)
+
+    try:
+        app = preload()
+    except Exception as e:
+        if not reloading:
+            raise
+        logger.exception("reload failed, old workers keep serving: %r", e)
+        app = None
+
+    Master(app, sock, args.workers, args).run()
+
+
+if __name__ == "__main__":
+    main()
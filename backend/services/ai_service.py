@@ -1,49 +1,115 @@
 import os
-import uuid
+import io
+import logging
+import asyncio
 import requests
 import edge_tts
-from datetime import datetime
+from typing import List, Optional
 from gtts import gTTS
+from concurrent.futures import ThreadPoolExecutor
+from services.audio_storage import get_audio_storage, content_name
+from services.circuit_breaker import CircuitOpenError, get_breaker
+
+logger = logging.getLogger(__name__)
 
 # Load Gemini API key
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_API_URL = (f"https://generativelanguage.googleapis.com/v1/models/gemini-2.5-flash-lite:generateContent?key={GEMINI_API_KEY}")
 
+TTS_TIMEOUT_SECONDS = float(os.getenv("TTS_TIMEOUT_SECONDS", "15"))
+TTS_THREADS = int(os.getenv("TTS_THREADS", "4"))
+TTS_BREAKER_SETTINGS = {
+    "failure_threshold": int(os.getenv("TTS_BREAKER_FAILURES", "3")),
+    "slow_call_seconds": float(os.getenv("TTS_BREAKER_SLOW_SECONDS", "8")),
+    "cooldown_seconds": float(os.getenv("TTS_BREAKER_COOLDOWN_SECONDS", "30")),
+}
+
+# Blocking providers (gTTS) run here instead of on the event loop
+_tts_executor = ThreadPoolExecutor(max_workers=TTS_THREADS, thread_name_prefix="tts")
+
+
+async def _edge_tts(text: str) -> bytes:
+    # options en-US-GuyNeural, en-US-JennyNeural, en-GB-RyanNeural,
+    #  en-GB-SoniaNeural, en-AU-NatashaNeural, en-AU-WilliamNeural,
+    #  en-IN-NeerjaNeural, en-CA-ClaraNeural, en-CA-LiamNeural, 
+    # en-US-AriaNeural, en-US-AnaNeural,
+    #  en-US-EricNeural, en-US-JoshNeural, en-US-LibbyNeural
+    voice = "en-GB-RyanNeural"
+    communicate = edge_tts.Communicate(
+        text, 
+        voice,
+        rate="+10%",
+        pitch="-0Hz"
+    )
+    audio = bytearray()
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio.extend(chunk["data"])
+    return bytes(audio)
+
+
+def _gtts_blocking(text: str) -> bytes:
+    tts = gTTS(text=text, lang="en", slow=False)
+    buffer = io.BytesIO()
+    tts.write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+async def _gtts(text: str) -> bytes:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_tts_executor, _gtts_blocking, text)
+
+
+# Tried in order; an open breaker routes straight to the next provider
+TTS_PROVIDERS = [
+    ("edge-tts", _edge_tts),
+    ("gtts", _gtts),
+]
+
+
+async def _with_timeout(fn, text: str) -> bytes:
+    return await asyncio.wait_for(fn(text), TTS_TIMEOUT_SECONDS)
+
+
+async def synthesize(text: str) -> bytes:
+    """Run ``text`` through the first healthy TTS provider."""
+    last_error = None
+    attempted = False
+    for force in (False, True):
+        for name, fn in TTS_PROVIDERS:
+            breaker = get_breaker(f"tts:{name}", **TTS_BREAKER_SETTINGS)
+            try:
+                return await breaker.call(_with_timeout, fn, text, force=force)
+            except CircuitOpenError:
+                continue
+            except Exception as e:
+                attempted = True
+                logger.warning("%s failed: %r, trying next provider", name, e)
+                last_error = e
+        # Every breaker was open: trying them anyway beats failing outright
+        if attempted:
+            break
+
+    raise RuntimeError(f"All TTS providers failed: {last_error!r}")
+
+
 async def generate_speech(text: str) -> str:
-    # Create uploads directory if it doesn't exist
-    uploads_dir = "uploads"
-    os.makedirs(uploads_dir, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid.uuid4())[:8]
-    filename = f"response_{timestamp}_{unique_id}.mp3"
-    output_audio = os.path.join(uploads_dir, filename)
+    """Synthesize ``text`` and store it; returns the content-hashed audio name."""
+    data = await synthesize(text)
+    return await get_audio_storage().save(content_name(data), data)
 
-    try:
-        # options en-US-GuyNeural, en-US-JennyNeural, en-GB-RyanNeural,
-        #  en-GB-SoniaNeural, en-AU-NatashaNeural, en-AU-WilliamNeural,
-        #  en-IN-NeerjaNeural, en-CA-ClaraNeural, en-CA-LiamNeural, 
-        # en-US-AriaNeural, en-US-AnaNeural,
-        #  en-US-EricNeural, en-US-JoshNeural, en-US-LibbyNeural
-        voice = "en-GB-RyanNeural"
-        communicate = edge_tts.Communicate(
-            text, 
-            voice,
-            rate="+10%",
-            pitch="-0Hz"
-        )
-        await communicate.save(output_audio)
-        return output_audio
-    except Exception as e:
-        print(f"Edge TTS failed: {e}, falling back to gTTS")
-        tts = gTTS(text=text, lang="en", slow=False)
-        tts.save(output_audio)
-        return output_audio
-
-
-def get_gemini_response(user_input: str) -> str:
+
+def build_prompt(user_input: str, memories: Optional[List[dict]] = None) -> str:
+    prompt = f"Be a friendly therapist, no emojis, no asterisks, keep it short: {user_input}"
+    if memories:
+        recalled = "\n".join(f"- ({m['timestamp'][:10]}, {m['sender']}) {m['text']}" for m in memories)
+        prompt += f"\n\nRelevant things from earlier sessions, mention them only if they help:\n{recalled}"
+    return prompt
+
+
+def get_gemini_response(user_input: str, memories: Optional[List[dict]] = None) -> str:
     payload = {
-        "contents": [{"parts": [{"text": f"Be a friendly therapist, no emojis, no asterisks, keep it short: {user_input}"}]}],
+        "contents": [{"parts": [{"text": build_prompt(user_input, memories)}]}],
         "generationConfig": {"maxOutputTokens": 1024}
     }
     headers = {"Content-Type": "application/json"}
@@ -0,0 +1,194 @@
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional
+from pymongo import UpdateOne
+
+from database import get_database
+
+# Gaps longer than this inside a session are treated as the user stepping away
+SESSION_IDLE_GAP = timedelta(minutes=30)
+
+POSITIVE_WORDS = {
+    "better", "calm", "calmer", "confident", "content", "enjoy", "enjoyed", "excited",
+    "glad", "good", "grateful", "great", "happy", "hope", "hopeful", "improving",
+    "love", "loved", "motivated", "okay", "peaceful", "proud", "relaxed", "relieved",
+    "rested", "safe", "strong", "supported", "thankful", "well",
+}
+
+NEGATIVE_WORDS = {
+    "afraid", "alone", "angry", "anxious", "anxiety", "ashamed", "awful", "bad",
+    "depressed", "desperate", "exhausted", "frustrated", "guilty", "hate", "hopeless",
+    "hurt", "insecure", "irritated", "lonely", "lost", "miserable", "nervous",
+    "overwhelmed", "panic", "sad", "scared", "stressed", "terrible", "tired",
+    "upset", "worried", "worthless",
+}
+
+NEGATIONS = {"not", "no", "never", "don't", "dont", "isn't", "wasn't", "can't", "cannot"}
+
+
+def get_collection(workload: Optional[str] = None):
+    """Safely get the MongoDB daily rollup collection after startup."""
+    db = get_database(workload)
+    return db["user_daily_stats"]
+
+
+def sentiment_score(text: str) -> float:
+    """Lexicon sentiment in [-1, 1]; a negation flips the next sentiment word."""
+    pos = neg = 0
+    negate = False
+    for word in re.findall(r"[a-z']+", text.lower()):
+        if word in NEGATIONS:
+            negate = True
+            continue
+        if word in POSITIVE_WORDS:
+            if negate:
+                neg += 1
+            else:
+                pos += 1
+        elif word in NEGATIVE_WORDS:
+            if negate:
+                pos += 1
+            else:
+                neg += 1
+        negate = False
+    if pos + neg == 0:
+        return 0.0
+    return (pos - neg) / (pos + neg)
+
+
+def day_key(timestamp: datetime) -> str:
+    return timestamp.strftime("%Y-%m-%d")
+
+
+async def record_message_stats(
+    user_id: str,
+    sender: str,
+    sentiment: float,
+    timestamp: datetime,
+    session_id: Optional[str] = None,
+    previous: Optional[dict] = None,
+) -> None:
+    """
+    Fold one saved message into the user's daily bucket.
+    ``previous`` is the session summary before this message was recorded.
+    """
+    inc = {"messages": 1, f"{sender}_messages": 1}
+    if sender == "user":
+        inc["sentiment_sum"] = sentiment
+        inc["sentiment_count"] = 1
+
+    last_at = (previous or {}).get("last_message_at")
+    if last_at:
+        gap = timestamp - last_at
+        if sender == "assistant" and previous.get("last_sender") == "user":
+            inc["latency_sum_ms"] = int(gap.total_seconds() * 1000)
+            inc["latency_count"] = 1
+        if gap < SESSION_IDLE_GAP:
+            inc["session_seconds"] = gap.total_seconds()
+
+    update = {"$inc": inc, "$set": {"updated_at": datetime.utcnow()}}
+    if session_id:
+        update["$addToSet"] = {"sessions": session_id}
+
+    await get_collection().update_one(
+        {"user_id": user_id, "day": day_key(timestamp)},
+        update,
+        upsert=True,
+    )
+
+
+async def get_user_daily_stats(user_id: str, days: int = 30) -> List[dict]:
+    """Read precomputed buckets for the last ``days`` days, oldest first."""
+    since = day_key(datetime.utcnow() - timedelta(days=days - 1))
+    cursor = get_collection("analytics").find({"user_id": user_id, "day": {"$gte": since}}).sort("day", 1)
+    return [doc async for doc in cursor]
+
+
+async def backfill_message_sentiment(batch_size: int = 500) -> int:
+    """Score messages saved before sentiment was stored on write."""
+    messages = get_database()["messages"]
+    updated = 0
+    ops = []
+    async for doc in messages.find({"sentiment": {"$exists": False}}, {"message": 1}):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"sentiment": sentiment_score(doc["message"])}}))
+        if len(ops) >= batch_size:
+            updated += (await messages.bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        updated += (await messages.bulk_write(ops, ordered=False)).modified_count
+    return updated
+
+
+async def rebuild_daily_stats(user_id: Optional[str] = None) -> None:
+    """
+    Recompute buckets from raw messages and $merge them into the rollup
+    collection. Meant for backfills; dashboards never run this.
+    """
+    messages = get_database()["messages"]
+    idle_ms = int(SESSION_IDLE_GAP.total_seconds() * 1000)
+    is_user = {"$eq": ["$sender", "user"]}
+    is_assistant = {"$eq": ["$sender", "assistant"]}
+    has_gap = {"$ne": ["$gap_ms", None]}
+    is_reply = {"$and": [is_assistant, {"$eq": ["$prev_sender", "user"]}, has_gap]}
+
+    pipeline = []
+    if user_id:
+        pipeline.append({"$match": {"user_id": user_id}})
+    pipeline += [
+        {"$setWindowFields": {
+            "partitionBy": "$session_id",
+            "sortBy": {"timestamp": 1},
+            "output": {
+                "prev_ts": {"$shift": {"output": "$timestamp", "by": -1}},
+                "prev_sender": {"$shift": {"output": "$sender", "by": -1}},
+            },
+        }},
+        {"$addFields": {"gap_ms": {"$cond": [
+            {"$and": [{"$ne": ["$session_id", None]}, {"$ne": ["$prev_ts", None]}]},
+            {"$subtract": ["$timestamp", "$prev_ts"]},
+            None,
+        ]}}},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+            },
+            "messages": {"$sum": 1},
+            "user_messages": {"$sum": {"$cond": [is_user, 1, 0]}},
+            "assistant_messages": {"$sum": {"$cond": [is_assistant, 1, 0]}},
+            "sentiment_sum": {"$sum": {"$cond": [is_user, {"$ifNull": ["$sentiment", 0]}, 0]}},
+            "sentiment_count": {"$sum": {"$cond": [is_user, 1, 0]}},
+            "latency_sum_ms": {"$sum": {"$cond": [is_reply, "$gap_ms", 0]}},
+            "latency_count": {"$sum": {"$cond": [is_reply, 1, 0]}},
+            "session_seconds": {"$sum": {"$cond": [
+                {"$and": [has_gap, {"$lt": ["$gap_ms", idle_ms]}]},
+                {"$divide": ["$gap_ms", 1000]},
+                0,
+            ]}},
+            "sessions": {"$addToSet": "$session_id"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            "day": "$_id.day",
+            "messages": 1,
+            "user_messages": 1,
+            "assistant_messages": 1,
+            "sentiment_sum": 1,
+            "sentiment_count": 1,
+            "latency_sum_ms": 1,
+            "latency_count": 1,
+            "session_seconds": 1,
+            "sessions": {"$filter": {"input": "$sessions", "cond": {"$ne": ["$$this", None]}}},
+            "updated_at": "$$NOW",
+        }},
+        {"$merge": {
+            "into": "user_daily_stats",
+            "on": ["user_id", "day"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert",
+        }},
+    ]
+
+    async for _ in messages.aggregate(pipeline, allowDiskUse=True):
+        pass
@@ -0,0 +1,414 @@
+import os
+import time
+import asyncio
+import hashlib
+import tempfile
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+# "local" keeps files on this node's disk, "gridfs" shares them through MongoDB
+AUDIO_STORAGE_BACKEND = os.getenv("AUDIO_STORAGE_BACKEND", "local").lower()
+AUDIO_UPLOADS_DIR = os.getenv("AUDIO_UPLOADS_DIR", "uploads")
+AUDIO_GRIDFS_BUCKET = os.getenv("AUDIO_GRIDFS_BUCKET", "audio")
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://127.0.0.1:8000").rstrip("/")
+# Comma-separated renditions offered through Accept negotiation ("" disables)
+AUDIO_VARIANTS = [v.strip() for v in os.getenv("AUDIO_VARIANTS", "opus,low").split(",") if v.strip()]
+# Identical replies share one content-addressed file, so files are not deleted
+# per reply: each save marks the file used, and a sweeper removes files
+# nobody has saved for this long.
+AUDIO_TTL_SECONDS = int(os.getenv("AUDIO_TTL_SECONDS", "3600"))
+AUDIO_SWEEP_INTERVAL_SECONDS = int(os.getenv("AUDIO_SWEEP_INTERVAL_SECONDS", "300"))
+
+CHUNK_SIZE = 64 * 1024
+
+# Alternate renditions of an mp3 reply, produced on first request with ffmpeg.
+# key -> (file extension, content type, ffmpeg output arguments)
+VARIANTS = {
+    "opus": ("opus", "audio/ogg; codecs=opus", ["-c:a", "libopus", "-b:a", "24k", "-f", "ogg"]),
+    "low": ("low.mp3", "audio/mpeg", ["-c:a", "libmp3lame", "-b:a", "32k", "-ac", "1", "-f", "mp3"]),
+}
+
+
+class StoredAudio:
+    """Metadata for a stored audio file."""
+
+    def __init__(self, name: str, length: int, content_type: str = "audio/mpeg"):
+        self.name = name
+        self.length = length
+        self.content_type = content_type
+
+
+def _content_type(name: str) -> str:
+    return "audio/ogg; codecs=opus" if name.endswith(".opus") else "audio/mpeg"
+
+
+def _safe_name(name: str) -> str:
+    """Reject anything that is not a plain file name."""
+    if not name or name != os.path.basename(name) or name.startswith("."):
+        raise ValueError(f"Invalid audio name: {name}")
+    return name
+
+
+class AudioStorage:
+    """Interface for generated audio storage backends."""
+
+    async def save(self, name: str, data: bytes, content_type: str = "audio/mpeg") -> str:
+        """Store ``data`` under ``name``, or only mark it used if already stored."""
+        raise NotImplementedError
+
+    async def stat(self, name: str) -> Optional[StoredAudio]:
+        raise NotImplementedError
+
+    def open_range(self, name: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream bytes ``start``..``end`` (inclusive) of a stored file."""
+        raise NotImplementedError
+
+    async def touch(self, name: str) -> bool:
+        """Mark a stored file used now; False if it no longer exists."""
+        raise NotImplementedError
+
+    async def delete(self, name: str) -> bool:
+        raise NotImplementedError
+
+    async def sweep(self, unused_since: datetime) -> List[str]:
+        """Delete files not saved since ``unused_since`` (naive UTC); returns their names."""
+        raise NotImplementedError
+
+
+class LocalAudioStorage(AudioStorage):
+    """Stores audio on the local disk. Only suitable for a single node."""
+
+    def __init__(self, directory: str = AUDIO_UPLOADS_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, _safe_name(name))
+
+    async def save(self, name: str, data: bytes, content_type: str = "audio/mpeg") -> str:
+        path = self._path(name)
+
+        def write():
+            try:
+                # Same name, same bytes: just mark the file used (mtime = last use)
+                os.utime(path)
+                return
+            except FileNotFoundError:
+                pass
+            # Identical replies can be saved concurrently: each write gets its
+            # own temp file, and whichever replace lands last wins harmlessly.
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f"{name}.", suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except FileNotFoundError:
+                    pass
+                raise
+
+        await asyncio.to_thread(write)
+        return name
+
+    async def stat(self, name: str) -> Optional[StoredAudio]:
+        path = self._path(name)
+        try:
+            size = (await asyncio.to_thread(os.stat, path)).st_size
+        except FileNotFoundError:
+            return None
+        return StoredAudio(name, size, _content_type(name))
+
+    async def open_range(self, name: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        path = self._path(name)
+        f = await asyncio.to_thread(open, path, "rb")
+        try:
+            await asyncio.to_thread(f.seek, start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+                chunk = await asyncio.to_thread(f.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+
+    async def touch(self, name: str) -> bool:
+        try:
+            await asyncio.to_thread(os.utime, self._path(name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def delete(self, name: str) -> bool:
+        path = self._path(name)
+        try:
+            await asyncio.to_thread(os.remove, path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def sweep(self, unused_since: datetime) -> List[str]:
+        cutoff = unused_since.replace(tzinfo=timezone.utc).timestamp()
+
+        def sweep():
+            removed = []
+            for entry in os.scandir(self.directory):
+                if not entry.is_file() or entry.stat().st_mtime >= cutoff:
+                    continue
+                # Another worker may be sweeping the same directory
+                try:
+                    if entry.name.endswith((".part", ".del")):
+                        os.remove(entry.path)
+                        continue
+                    # Move aside first, then re-check: a save that touched the
+                    # file in between wins and the file is put back.
+                    tombstone = f"{entry.path}.del"
+                    os.rename(entry.path, tombstone)
+                    if os.stat(tombstone).st_mtime >= cutoff:
+                        os.replace(tombstone, entry.path)
+                    else:
+                        os.remove(tombstone)
+                        removed.append(entry.name)
+                except FileNotFoundError:
+                    continue
+            return removed
+
+        return await asyncio.to_thread(sweep)
+
+
+class GridFSAudioStorage(AudioStorage):
+    """Stores audio in MongoDB GridFS so every worker and node can serve it."""
+
+    def __init__(self, bucket_name: str = AUDIO_GRIDFS_BUCKET):
+        self.bucket_name = bucket_name
+        self._bucket: Optional[AsyncIOMotorGridFSBucket] = None
+
+    def _get_bucket(self) -> AsyncIOMotorGridFSBucket:
+        # Created lazily: the Motor client only exists after startup
+        if self._bucket is None:
+            self._bucket = AsyncIOMotorGridFSBucket(get_database(), bucket_name=self.bucket_name)
+        return self._bucket
+
+    async def _find(self, name: str):
+        cursor = self._get_bucket().find({"filename": _safe_name(name)}).sort("uploadDate", -1).limit(1)
+        async for grid_out in cursor:
+            return grid_out
+        return None
+
+    def _files(self):
+        return get_database()[f"{self.bucket_name}.files"]
+
+    async def save(self, name: str, data: bytes, content_type: str = "audio/mpeg") -> str:
+        now = datetime.utcnow()
+        # Names are content hashes, so an existing file already holds these
+        # bytes. Marking it used is atomic against sweep's conditional delete:
+        # if the sweep won, nothing matches and the bytes are uploaded again.
+        touched = await self._files().update_many(
+            {"filename": _safe_name(name)},
+            {"$max": {"metadata.last_used": now}},
+        )
+        if touched.matched_count:
+            return name
+        await self._get_bucket().upload_from_stream(
+            _safe_name(name),
+            data,
+            metadata={"content_type": content_type, "last_used": now},
+        )
+        return name
+
+    async def stat(self, name: str) -> Optional[StoredAudio]:
+        grid_out = await self._find(name)
+        if grid_out is None:
+            return None
+        content_type = (grid_out.metadata or {}).get("content_type", "audio/mpeg")
+        return StoredAudio(name, grid_out.length, content_type)
+
+    async def open_range(self, name: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        grid_out = await self._get_bucket().open_download_stream_by_name(_safe_name(name))
+        grid_out.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+            chunk = await grid_out.read(size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+    async def touch(self, name: str) -> bool:
+        touched = await self._files().update_many(
+            {"filename": _safe_name(name)},
+            {"$max": {"metadata.last_used": datetime.utcnow()}},
+        )
+        return touched.matched_count > 0
+
+    async def delete(self, name: str) -> bool:
+        deleted = False
+        cursor = self._get_bucket().find({"filename": _safe_name(name)})
+        async for grid_out in cursor:
+            await self._get_bucket().delete(grid_out._id)
+            deleted = True
+        return deleted
+
+    async def sweep(self, unused_since: datetime) -> List[str]:
+        files = self._files()
+        chunks = get_database()[f"{self.bucket_name}.chunks"]
+        stale = {"$or": [
+            {"metadata.last_used": {"$lt": unused_since}},
+            # Files stored before last_used was tracked
+            {"metadata.last_used": {"$exists": False}, "uploadDate": {"$lt": unused_since}},
+        ]}
+        removed = []
+        async for doc in files.find(stale, {"filename": 1}):
+            result = await files.delete_one({"_id": doc["_id"], **stale})
+            if result.deleted_count:
+                await chunks.delete_many({"files_id": doc["_id"]})
+                removed.append(doc["filename"])
+        return removed
+
+
+_storage: Optional[AudioStorage] = None
+
+
+def get_audio_storage() -> AudioStorage:
+    """Return the configured audio storage backend."""
+    global _storage
+    if _storage is None:
+        if AUDIO_STORAGE_BACKEND == "gridfs":
+            _storage = GridFSAudioStorage()
+        elif AUDIO_STORAGE_BACKEND == "local":
+            _storage = LocalAudioStorage()
+        else:
+            raise ValueError(f"Unknown AUDIO_STORAGE_BACKEND: {AUDIO_STORAGE_BACKEND}")
+    return _storage
+
+
+def content_name(data: bytes, extension: str = "mp3") -> str:
+    """Content-addressed name, so a URL always refers to the same bytes."""
+    return f"{hashlib.sha256(data).hexdigest()[:32]}.{extension}"
+
+
+def variant_name(name: str, variant: str) -> str:
+    """Stored name of a rendition of ``name``."""
+    stem = name.rsplit(".", 1)[0]
+    return f"{stem}.{VARIANTS[variant][0]}"
+
+
+async def read_audio(name: str) -> bytes:
+    """Read a whole stored file into memory."""
+    data = bytearray()
+    async for chunk in get_audio_storage().open_range(name):
+        data.extend(chunk)
+    return bytes(data)
+
+
+_variant_locks: dict = {}
+# Rendition name -> monotonic time until which a failed transcode is not retried
+_variant_failures: dict = {}
+VARIANT_FAILURE_TTL = 300
+
+
+async def get_or_create_variant(name: str, variant: str) -> Optional[StoredAudio]:
+    """
+    Return the stored rendition of ``name``, transcoding it on first use.
+    Returns None when the rendition cannot be produced (e.g. no ffmpeg).
+    """
+    storage = get_audio_storage()
+    target = variant_name(name, variant)
+    stored = await storage.stat(target)
+    if stored:
+        return stored
+
+    if _variant_failures.get(target, 0) > time.monotonic():
+        return None
+
+    lock = _variant_locks.setdefault(target, asyncio.Lock())
+    try:
+        async with lock:
+            stored = await storage.stat(target)
+            if stored:
+                return stored
+            if _variant_failures.get(target, 0) > time.monotonic():
+                return None
+
+            _, content_type, output_args = VARIANTS[variant]
+            try:
+                source = await read_audio(name)
+                proc = await asyncio.create_subprocess_exec(
+                    "ffmpeg", "-hide_banner", "-loglevel", "error",
+                    "-i", "pipe:0", *output_args, "pipe:1",
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                data, err = await proc.communicate(source)
+                if proc.returncode != 0 or not data:
+                    raise RuntimeError(err.decode(errors="ignore").strip())
+            except Exception as e:
+                logger.warning("Transcoding %s to %s failed: %s", name, variant, e)
+                # Callers fall back to the original; don't rerun ffmpeg on every request
+                now = time.monotonic()
+                for key in [k for k, until in _variant_failures.items() if until <= now]:
+                    del _variant_failures[key]
+                _variant_failures[target] = now + VARIANT_FAILURE_TTL
+                return None
+
+            await storage.save(target, data, content_type)
+            _variant_failures.pop(target, None)
+            return StoredAudio(target, len(data), content_type)
+    finally:
+        _variant_locks.pop(target, None)
+
+
+def build_audio_url(name: str) -> str:
+    """Public URL for a stored audio file."""
+    return f"{PUBLIC_BASE_URL}/audio/{name}"
+
+
+def audio_name_from_url(url: str) -> str:
+    """Stored name behind a URL from build_audio_url."""
+    return url.rsplit("/", 1)[-1]
+
+
+async def expire_unused_audio(ttl_seconds: int = AUDIO_TTL_SECONDS) -> int:
+    """Delete stored audio (originals and variants) unused for ``ttl_seconds``."""
+    removed = await get_audio_storage().sweep(datetime.utcnow() - timedelta(seconds=ttl_seconds))
+    for name in removed:
+        logger.info("Deleted audio: %s", name, extra={"event": "audio_deleted"})
+    return len(removed)
+
+
+_sweeper: Optional[asyncio.Task] = None
+
+
+async def _sweeper_loop() -> None:
+    while True:
+        try:
+            await expire_unused_audio()
+        except Exception as e:
+            logger.exception("Audio sweep failed: %s", e)
+        await asyncio.sleep(AUDIO_SWEEP_INTERVAL_SECONDS)
+
+
+def start_audio_sweeper() -> None:
+    global _sweeper
+    _sweeper = asyncio.create_task(_sweeper_loop())
+
+
+async def stop_audio_sweeper() -> None:
+    if _sweeper:
+        _sweeper.cancel()
+        await asyncio.gather(_sweeper, return_exceptions=True)
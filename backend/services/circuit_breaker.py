@@ -0,0 +1,140 @@
+import time
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Trips after ``failure_threshold`` consecutive failures (calls slower than
+    ``slow_call_seconds`` count as failures), rejects calls for
+    ``cooldown_seconds``, then lets a single probe through to decide whether
+    to close again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        slow_call_seconds: float = 8.0,
+        cooldown_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown_seconds = cooldown_seconds
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejections = 0
+        self.transitions: Dict[str, int] = {}
+
+    def _transition(self, new_state: str):
+        if new_state == self.state:
+            return
+        key = f"{self.state}->{new_state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        logger.warning("Circuit '%s': %s", self.name, key)
+        self.state = new_state
+        if new_state == OPEN:
+            self.opened_at = time.monotonic()
+        if new_state != HALF_OPEN:
+            self.probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Whether a call may go through right now (reserves the half-open probe)."""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            self._transition(HALF_OPEN)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.rejections += 1
+        return False
+
+    def record_success(self, duration: float):
+        self.calls += 1
+        if duration > self.slow_call_seconds:
+            self.slow_calls += 1
+            self._on_failure()
+            return
+        self.consecutive_failures = 0
+        self._transition(CLOSED)
+
+    def record_failure(self):
+        self.calls += 1
+        self.failures += 1
+        self._on_failure()
+
+    def _on_failure(self):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(OPEN)
+
+    async def call(self, func, *args, force: bool = False, **kwargs):
+        """
+        Run an async callable through the breaker. ``force`` runs it even
+        when the breaker is open (the outcome is still recorded).
+        """
+        if not force and not self.allow_request():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        probe = not force and self.state == HALF_OPEN
+        start = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        finally:
+            # A cancelled probe (CancelledError is a BaseException) records no
+            # outcome; free the slot or the breaker stays half-open for good.
+            if probe and self.state == HALF_OPEN:
+                self.probe_in_flight = False
+        self.record_success(time.monotonic() - start)
+        return result
+
+    def snapshot(self) -> dict:
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = max(0.0, self.cooldown_seconds - (time.monotonic() - self.opened_at))
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "calls": self.calls,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "rejections": self.rejections,
+            "transitions": dict(self.transitions),
+            "retry_in_seconds": round(retry_in, 1) if retry_in is not None else None,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Return the process-wide breaker for ``name``, creating it on first use."""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name, **kwargs)
+    return _breakers[name]
+
+
+def breaker_snapshots() -> list:
+    return [b.snapshot() for b in _breakers.values()]
@@ -0,0 +1,136 @@
+import os
+import asyncio
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pymongo.errors import DuplicateKeyError
+
+from database import get_database
+from services.audio_storage import audio_name_from_url, get_audio_storage
+
+# How long a finished response can be replayed (enforced by a TTL index)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+# How long a retry waits for the original request before giving up
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "60"))
+# An in-progress marker older than this belongs to a crashed request
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "180"))
+POLL_SECONDS = 0.25
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+def get_collection():
+    """Safely get the MongoDB idempotency key collection after startup."""
+    db = get_database()
+    return db["idempotency_keys"]
+
+
+async def _claim(doc_id: str) -> bool:
+    now = datetime.utcnow()
+    try:
+        await get_collection().insert_one({
+            "_id": doc_id,
+            "status": IN_PROGRESS,
+            "created_at": now,
+            "locked_at": now,
+        })
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def is_completed(key: Optional[str], scope: str, user_id: Optional[str]) -> bool:
+    """True if a retry with ``key`` would be answered from a stored response."""
+    if not key or not user_id or len(key) > 255:
+        return False
+    doc = await get_collection().find_one({"_id": f"{scope}:{user_id}:{key}"}, {"status": 1})
+    return doc is not None and doc["status"] == COMPLETED
+
+
+async def _refresh_audio(response) -> bool:
+    """
+    Mark the audio a stored response links to as used again, so the sweeper
+    keeps it while retries still arrive. False once it has been swept.
+    """
+    url = response.get("audio_url") if isinstance(response, dict) else None
+    if not url:
+        return True
+    return await get_audio_storage().touch(audio_name_from_url(url))
+
+
+async def run_idempotent(
+    key: Optional[str],
+    scope: str,
+    user_id: str,
+    handler: Callable[[], Awaitable],
+):
+    """
+    Run ``handler`` once per (scope, user_id, key). Retries get the stored
+    response, or wait while the first request is still running. Error
+    responses are not stored, so a retry after an error runs again. A stored
+    response whose audio has already been swept counts as expired.
+    """
+    if not key:
+        return await handler()
+    if len(key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+    col = get_collection()
+    doc_id = f"{scope}:{user_id}:{key}"
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+
+    claimed = await _claim(doc_id)
+    while not claimed:
+        existing = await col.find_one({"_id": doc_id})
+        if existing is None:
+            claimed = await _claim(doc_id)
+            continue
+        if existing["status"] == COMPLETED:
+            if await _refresh_audio(existing["response"]):
+                return JSONResponse(
+                    existing["response"],
+                    status_code=existing.get("status_code", 200),
+                    headers={"Idempotent-Replayed": "true"},
+                )
+            # Replaying would hand out a URL that now 404s
+            await col.delete_one({"_id": doc_id, "status": COMPLETED})
+            continue
+        if datetime.utcnow() - existing["locked_at"] > timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS):
+            res = await col.update_one(
+                {"_id": doc_id, "status": IN_PROGRESS, "locked_at": existing["locked_at"]},
+                {"$set": {"locked_at": datetime.utcnow()}},
+            )
+            claimed = res.modified_count == 1
+            continue
+        if loop.time() >= deadline:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "1"},
+            )
+        await asyncio.sleep(POLL_SECONDS)
+
+    try:
+        result = await handler()
+    except BaseException:
+        await col.delete_one({"_id": doc_id})
+        raise
+
+    if isinstance(result, Response):
+        await col.delete_one({"_id": doc_id})
+        return result
+
+    await col.update_one(
+        {"_id": doc_id},
+        {"$set": {
+            "status": COMPLETED,
+            "status_code": 200,
+            "response": jsonable_encoder(result),
+            "completed_at": datetime.utcnow(),
+        }},
+    )
+    return result
@@ -0,0 +1,145 @@
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
+# "json" for log shippers, "text" for reading locally
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# event=rate pairs: keep only that fraction of the event's DEBUG/INFO records
+LOG_SAMPLE_RATES = os.getenv(
+    "LOG_SAMPLE_RATES",
+    "file_deleted=0.1,audio_deleted=0.1",
+)
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came from ``extra=``
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    rates = {}
+    for pair in value.split(","):
+        event, _, rate = pair.partition("=")
+        if event.strip() and rate.strip():
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request ID; runs in the thread that logged."""
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Drops a share of low-level records tagged ``extra={"event": ...}``; warnings always pass."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    """Like QueueHandler, but keeps the traceback out of ``msg`` for the JSON ``exc`` field."""
+
+    def prepare(self, record):
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+
+class _Pipeline:
+    handler: Optional[_QueueHandler] = None
+    listener: Optional[QueueListener] = None
+
+
+_pipeline = _Pipeline()
+
+
+def _start_listener():
+    log_queue = queue.SimpleQueue()
+    _pipeline.handler.queue = log_queue
+
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    _pipeline.listener = QueueListener(log_queue, output)
+    _pipeline.listener.start()
+
+
+def setup_logging() -> None:
+    """
+    Route all logging through a queue so request handlers never block on
+    stdout; a background listener thread does the formatting and writing.
+    """
+    if _pipeline.handler is not None:
+        return
+    _pipeline.handler = _QueueHandler(queue.SimpleQueue())
+    _pipeline.handler.addFilter(RequestContextFilter())
+    _pipeline.handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+    _start_listener()
+
+    root = logging.getLogger()
+    root.handlers = [_pipeline.handler]
+    root.setLevel(LOG_LEVEL)
+
+    # The listener thread does not survive fork (see serve.py)
+    os.register_at_fork(after_in_child=_start_listener)
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records; call before exec or os._exit, which skip atexit."""
+    if _pipeline.listener is not None:
+        _pipeline.listener.stop()
+        _pipeline.listener = None
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import logging
+import traceback
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_MONITOR = os.getenv("LOOP_LAG_MONITOR", "true").lower() in ("1", "true", "yes")
+# A stall longer than this is reported with the stack that is blocking the loop
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "200"))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.05"))
+# asyncio debug mode also logs every callback slower than the threshold (costly)
+LOOP_ASYNCIO_DEBUG = os.getenv("LOOP_ASYNCIO_DEBUG", "false").lower() in ("1", "true", "yes")
+
+
+class LoopLagMonitor:
+    """
+    A heartbeat task on the event loop plus a watchdog thread. When the
+    heartbeat stops for longer than the threshold, the watchdog captures
+    the loop thread's stack, which names the blocking call (e.g. a
+    synchronous requests.post inside an async handler).
+    """
+
+    def __init__(self, threshold_ms: float = LOOP_LAG_THRESHOLD_MS, interval: float = LOOP_LAG_INTERVAL):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.last_beat = time.monotonic()
+        self.loop_thread_id: Optional[int] = None
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        self.last_stall: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def _heartbeat(self):
+        while True:
+            now = time.monotonic()
+            lag = now - self.last_beat - self.interval
+            if lag * 1000 > self.max_lag_ms:
+                self.max_lag_ms = lag * 1000
+            self.last_beat = now
+            await asyncio.sleep(self.interval)
+
+    def _watchdog(self):
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self.last_beat
+            stalled_for = time.monotonic() - beat
+            if stalled_for < self.threshold + self.interval or beat == reported_beat:
+                continue
+            # One report per stall, taken while the loop is still blocked
+            reported_beat = beat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unavailable>"
+            self.stalls += 1
+            self.last_stall = {
+                "stalled_ms": round(stalled_for * 1000, 1),
+                "at": time.time(),
+                "stack": stack,
+            }
+            logger.warning("Event loop blocked for %.0fms, loop thread stack:\n%s", stalled_for * 1000, stack)
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if LOOP_ASYNCIO_DEBUG:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watchdog, name="loop-lag-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "last_stall": self.last_stall,
+        }
+
+
+monitor = LoopLagMonitor()
@@ -0,0 +1,359 @@
+import os
+import re
+import json
+import time
+import zlib
+import logging
+import asyncio
+import threading
+import contextvars
+from functools import partial
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from bson import ObjectId
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process deployments only
+    fcntl = None
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "true").lower() in ("1", "true", "yes")
+MEMORY_DIR = os.getenv("MEMORY_DIR", "memory")
+# "hashing" needs nothing extra; any other value is a sentence-transformers model
+MEMORY_EMBEDDER = os.getenv("MEMORY_EMBEDDER", "sentence-transformers/all-MiniLM-L6-v2")
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "4"))
+# Cosine floor for a recalled message; unset uses the embedder's own default
+MEMORY_MIN_SCORE = os.getenv("MEMORY_MIN_SCORE")
+# float32 working copies of recently searched users are kept in RAM up to this size
+MEMORY_CACHE_MB = int(os.getenv("MEMORY_CACHE_MB", "512"))
+MEMORY_TEXT_CHARS = 500
+SEARCH_BLOCK_ROWS = 65536
+# A model that fails to load is retried after this long; memory is off meanwhile
+EMBEDDER_RETRY_SECONDS = 300
+# Bumped when the on-disk layout changes; older indexes are discarded
+INDEX_FORMAT = 2
+
+
+class HashingEmbedder:
+    """Signed feature hashing of words and word pairs; no model download needed."""
+
+    # Only lexical overlap counts, so related sentences score far lower than with a model
+    min_score = 0.12
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.id = f"hashing-{dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"\w+", text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(feature.encode())
+                out[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-9)
+
+
+class SentenceTransformerEmbedder:
+    """Small CPU sentence embedding model (384 dimensions for MiniLM)."""
+
+    min_score = 0.35
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.id = f"st:{model_name}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=32,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        ).astype(np.float32)
+
+
+_embedder = None
+_embedder_failed_at: Optional[float] = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    """
+    The configured embedder, or None while it cannot be loaded. There is no
+    fallback to another embedder: workers sharing an index must all produce
+    vectors in the same space, so a missing model turns memory off instead.
+    """
+    global _embedder, _embedder_failed_at
+    with _embedder_lock:
+        if _embedder is not None:
+            return _embedder
+        if _embedder_failed_at is not None and time.monotonic() - _embedder_failed_at < EMBEDDER_RETRY_SECONDS:
+            return None
+        try:
+            if MEMORY_EMBEDDER == "hashing":
+                _embedder = HashingEmbedder()
+            else:
+                _embedder = SentenceTransformerEmbedder(MEMORY_EMBEDDER)
+        except Exception as e:
+            _embedder_failed_at = time.monotonic()
+            logger.error(
+                "Embedding model %s unavailable (%s); memory is off in this process until it loads "
+                "(retried every %ds). Install sentence-transformers or set MEMORY_EMBEDDER=hashing.",
+                MEMORY_EMBEDDER, e, EMBEDDER_RETRY_SECONDS,
+            )
+            return None
+        return _embedder
+
+
+def min_score(embedder) -> float:
+    if MEMORY_MIN_SCORE is not None:
+        return float(MEMORY_MIN_SCORE)
+    return embedder.min_score
+
+
+class UserVectorIndex:
+    """
+    Append-only per-user index: ``vectors.f16`` holds float16 rows (memory
+    mapped for reads), ``meta.jsonl`` the matching message ids and
+    ``index.json`` the embedder that produced the vectors. Message texts
+    stay in MongoDB only, so archiving a message also ends its recall.
+    Searches run on a float32 copy grown in place as rows are appended.
+    """
+
+    def __init__(self, user_id: str, embedder):
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", user_id)
+        self.dir = os.path.join(MEMORY_DIR, safe)
+        self.vectors_path = os.path.join(self.dir, "vectors.f16")
+        self.meta_path = os.path.join(self.dir, "meta.jsonl")
+        self.info_path = os.path.join(self.dir, "index.json")
+        self.lock_path = os.path.join(self.dir, ".lock")
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.info = {"embedder": embedder.id, "dim": self.dim, "format": INDEX_FORMAT}
+        self.lock = threading.Lock()
+        self.matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self.count = 0
+        self.meta: List[dict] = []
+        self.meta_offset = 0
+        self.checked = False
+
+    def _file_lock(self, mode):
+        """Cross-process lock so readers never see a half-written append."""
+        lock_file = open(self.lock_path, "a")
+        if fcntl:
+            fcntl.flock(lock_file, mode)
+        return lock_file
+
+    def _read_info(self) -> Optional[dict]:
+        try:
+            with open(self.info_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _ensure_embedder(self):
+        """
+        Vectors from different embedders are not comparable. An index built
+        by another embedder or in an older layout (which kept message texts
+        on disk) is discarded; the index is derived data and refills as
+        messages are saved.
+        """
+        if self.checked:
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        lock_file = self._file_lock(fcntl.LOCK_EX if fcntl else None)
+        try:
+            current = self._read_info()
+            if current != self.info:
+                if os.path.exists(self.meta_path) or os.path.exists(self.vectors_path):
+                    logger.warning(
+                        "Discarding memory index %s: built by %s, now using %s",
+                        self.dir, (current or {}).get("embedder", "unknown"), self.embedder.id,
+                    )
+                for path in (self.vectors_path, self.meta_path):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                with open(self.info_path, "w", encoding="utf-8") as f:
+                    json.dump(self.info, f)
+        finally:
+            lock_file.close()
+        self.checked = True
+
+    def _refresh(self):
+        """Load rows appended since the last read (possibly by another worker)."""
+        self._ensure_embedder()
+        if not os.path.exists(self.vectors_path):
+            return
+        lock_file = self._file_lock(fcntl.LOCK_SH if fcntl else None)
+        try:
+            rows = os.path.getsize(self.vectors_path) // (self.dim * 2)
+            if rows < self.count:
+                # Discarded and restarted by another worker: reload from scratch
+                self.count, self.meta, self.meta_offset = 0, [], 0
+            if rows <= self.count:
+                return
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                f.seek(self.meta_offset)
+                new_meta = [json.loads(line) for line in f.readlines()]
+                self.meta_offset = f.tell()
+            disk = np.memmap(self.vectors_path, dtype=np.float16, mode="r", shape=(rows, self.dim))
+            if rows > self.matrix.shape[0]:
+                grown = np.zeros((max(rows, self.matrix.shape[0] * 2, 1024), self.dim), dtype=np.float32)
+                grown[:self.count] = self.matrix[:self.count]
+                self.matrix = grown
+            self.matrix[self.count:rows] = disk[self.count:rows]
+            del disk
+        finally:
+            lock_file.close()
+        self.meta.extend(new_meta)
+        self.count = rows
+
+    def append(self, vectors: np.ndarray, metas: List[dict]):
+        with self.lock:
+            self._ensure_embedder()
+            lock_file = self._file_lock(fcntl.LOCK_EX if fcntl else None)
+            try:
+                # A worker configured with another embedder may have taken the
+                # index over since we checked; never mix the two vector spaces
+                current = self._read_info()
+                if current != self.info:
+                    raise RuntimeError(
+                        f"Memory index {self.dir} now belongs to {(current or {}).get('embedder', 'unknown')}, "
+                        f"not {self.embedder.id}"
+                    )
+                with open(self.meta_path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(m, ensure_ascii=False) + "\n" for m in metas))
+                with open(self.vectors_path, "ab") as f:
+                    f.write(vectors.astype(np.float16).tobytes())
+            finally:
+                lock_file.close()
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[tuple]]:
+        """Top-``k`` (score, meta) per query row, scored by blocked dot products."""
+        with self.lock:
+            self._refresh()
+            n = self.count
+            if n == 0:
+                return [[] for _ in range(len(queries))]
+            scores = np.empty((len(queries), n), dtype=np.float32)
+            for start in range(0, n, SEARCH_BLOCK_ROWS):
+                end = min(start + SEARCH_BLOCK_ROWS, n)
+                scores[:, start:end] = queries @ self.matrix[start:end].T
+            meta = self.meta
+
+        k = min(k, n)
+        results = []
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top])]
+            results.append([(float(row[i]), meta[i]) for i in top])
+        return results
+
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+
+_indexes: "OrderedDict[str, UserVectorIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+# One writer thread keeps appends ordered and embeddings off the event loop
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+_pending: set = set()
+
+
+def get_index(user_id: str, embedder) -> UserVectorIndex:
+    with _indexes_lock:
+        index = _indexes.pop(user_id, None) or UserVectorIndex(user_id, embedder)
+        _indexes[user_id] = index
+        # Drop the least recently used working copies beyond the cache budget
+        while len(_indexes) > 1 and sum(i.nbytes() for i in _indexes.values()) > MEMORY_CACHE_MB * 1024 * 1024:
+            _indexes.popitem(last=False)
+        return index
+
+
+def _remember_blocking(user_id: str, text: str, meta: dict):
+    embedder = get_embedder()
+    if embedder is None:
+        return
+    vector = embedder.embed([text])
+    get_index(user_id, embedder).append(vector, [meta])
+
+
+def remember_message(message_id: str, user_id: str, sender: str, message: str, session_id: Optional[str], timestamp: str):
+    """Embed and index a saved message in the background."""
+    if not MEMORY_ENABLED or not message.strip():
+        return
+    meta = {
+        "id": message_id,
+        "session_id": session_id,
+        "sender": sender,
+        "timestamp": timestamp,
+    }
+    loop = asyncio.get_running_loop()
+    # copy_context keeps the request ID on log records from the writer thread
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(
+        _executor, context.run, _remember_blocking, user_id, message[:MEMORY_TEXT_CHARS], meta,
+    )
+    _pending.add(future)
+    # Done callbacks run in the context current here, so the request ID stays too
+    future.add_done_callback(partial(_remembered, message_id))
+
+
+def _remembered(message_id: str, future: asyncio.Future):
+    _pending.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Indexing message %s into memory failed", message_id, exc_info=future.exception())
+
+
+def _recall_blocking(user_id: str, query: str, exclude_session_id: Optional[str], k: int) -> List[tuple]:
+    """Candidate (score, meta) hits above the score floor, best first."""
+    embedder = get_embedder()
+    if embedder is None:
+        return []
+    query_vector = embedder.embed([query])
+    # Over-fetch so that filtering out the current session still leaves k hits
+    hits = get_index(user_id, embedder).search(query_vector, k * 4)[0]
+    floor = min_score(embedder)
+    return [
+        (score, meta) for score, meta in hits
+        if score >= floor and not (exclude_session_id and meta.get("session_id") == exclude_session_id)
+    ]
+
+
+async def recall_memories(user_id: str, query: str, exclude_session_id: Optional[str] = None, k: int = MEMORY_TOP_K) -> List[dict]:
+    """Most relevant earlier messages for ``query``, excluding the current session."""
+    if not MEMORY_ENABLED:
+        return []
+    try:
+        hits = await asyncio.to_thread(_recall_blocking, user_id, query, exclude_session_id, k)
+        if not hits:
+            return []
+        # Texts come from the live collection: archived or deleted messages drop out
+        ids = [ObjectId(meta["id"]) for _, meta in hits if ObjectId.is_valid(meta["id"])]
+        cursor = get_database("history")["messages"].find({"_id": {"$in": ids}, "user_id": user_id}, {"message": 1})
+        texts = {str(doc["_id"]): doc["message"][:MEMORY_TEXT_CHARS] async for doc in cursor}
+    except Exception as e:
+        logger.warning("Memory recall failed: %s", e)
+        return []
+
+    memories = []
+    for score, meta in hits:
+        text = texts.get(meta["id"])
+        if text is None or text == query[:MEMORY_TEXT_CHARS]:
+            # The turn being answered has usually been indexed already
+            continue
+        memories.append({**meta, "text": text, "score": round(score, 3)})
+        if len(memories) >= k:
+            break
+    return memories
@@ -1,14 +1,18 @@
+import re
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Tuple
 from bson import ObjectId
 
 from models.message import MessageInDB
 from database import get_database
+from services.sessions_service import record_session_message
+from services.analytics_service import record_message_stats, sentiment_score
+from services.memory_service import remember_message
 
 
-def get_collection():
+def get_collection(workload: Optional[str] = None):
     """Safely get the MongoDB messages collection after startup."""
-    db = get_database()
+    db = get_database(workload)
     return db["messages"]
 
 
@@ -21,18 +25,25 @@ async def save_message(user_id: str, sender: str, message: str, session_id: str
         "message": message,
         "session_id": session_id,
         "timestamp": datetime.utcnow(),
+        "sentiment": sentiment_score(message),
     }
 
     res = await col.insert_one(doc)
     created = await col.find_one({"_id": res.inserted_id})
 
+    previous = None
+    if session_id:
+        previous = await record_session_message(session_id, res.inserted_id, sender, message, doc["timestamp"])
+    await record_message_stats(user_id, sender, doc["sentiment"], doc["timestamp"], session_id, previous)
+    remember_message(str(res.inserted_id), user_id, sender, message, session_id, doc["timestamp"].isoformat())
+
     created["id"] = str(created["_id"])
     created["timestamp"] = created["timestamp"].isoformat()
     return MessageInDB(**created)
 
 
 async def get_chat_history(user_id: str, session_id: str = None) -> List[MessageInDB]:
-    col = get_collection()
+    col = get_collection("history")
 
     query = {"user_id": user_id}
     if session_id:
@@ -51,7 +62,7 @@ async def get_chat_history(user_id: str, session_id: str = None) -> List[Message
 
 async def get_session_messages(session_id: str) -> List[MessageInDB]:
     """Get all messages for a specific session."""
-    col = get_collection()
+    col = get_collection("history")
 
     msgs = []
     cursor = col.find({"session_id": session_id}).sort("timestamp", 1)
@@ -64,8 +75,84 @@ async def get_session_messages(session_id: str) -> List[MessageInDB]:
     return msgs
 
 
+async def get_session_messages_page(session_id: str, limit: int = 50) -> List[MessageInDB]:
+    """Latest ``limit`` messages of a session, oldest first."""
+    col = get_collection("history")
+
+    msgs = []
+    cursor = col.find({"session_id": session_id}).sort("timestamp", -1).limit(limit)
+
+    async for doc in cursor:
+        doc["id"] = str(doc["_id"])
+        doc["timestamp"] = doc["timestamp"].isoformat()
+        msgs.append(MessageInDB(**doc))
+
+    msgs.reverse()
+    return msgs
+
+
 async def delete_session_messages(session_id: str) -> int:
     """Delete all messages for a session."""
     col = get_collection()
     result = await col.delete_many({"session_id": session_id})
-    return result.deleted_count
\ No newline at end of file
+    return result.deleted_count
+
+
+SNIPPET_RADIUS = 80
+
+
+def build_snippet(text: str, query: str) -> Tuple[str, List[List[int]]]:
+    """
+    Cut a window of ``text`` around the first query term and return it with
+    [start, end) offsets of every term occurrence inside the snippet.
+    """
+    terms = [t for t in re.findall(r"\w+", query.lower()) if len(t) > 1]
+    if not terms:
+        return text[:2 * SNIPPET_RADIUS], []
+
+    # Prefix match so stemmed hits ("feeling" for "feel") are highlighted too
+    pattern = re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\w*", re.IGNORECASE)
+    first = pattern.search(text)
+    center = first.start() if first else 0
+    start = max(center - SNIPPET_RADIUS, 0)
+    end = min(center + SNIPPET_RADIUS, len(text))
+    snippet = text[start:end]
+
+    highlights = [[m.start(), m.end()] for m in pattern.finditer(snippet)]
+    if start > 0:
+        snippet = "..." + snippet
+        highlights = [[a + 3, b + 3] for a, b in highlights]
+    if end < len(text):
+        snippet += "..."
+    return snippet, highlights
+
+
+async def search_messages(
+    user_id: str,
+    query: str,
+    session_id: str = None,
+    skip: int = 0,
+    limit: int = 20,
+) -> List[Tuple[MessageInDB, float]]:
+    """Ranked full-text search over one user's messages (uses the text index)."""
+    col = get_collection("history")
+
+    filters = {"user_id": user_id, "$text": {"$search": query}}
+    if session_id:
+        filters["session_id"] = session_id
+
+    results = []
+    cursor = (
+        col.find(filters, {"score": {"$meta": "textScore"}})
+        .sort([("score", {"$meta": "textScore"}), ("timestamp", -1)])
+        .skip(skip)
+        .limit(limit)
+    )
+
+    async for doc in cursor:
+        score = doc.pop("score", 0.0)
+        doc["id"] = str(doc["_id"])
+        doc["timestamp"] = doc["timestamp"].isoformat()
+        results.append((MessageInDB(**doc), score))
+
+    return results
\ No newline at end of file
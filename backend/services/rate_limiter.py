@@ -0,0 +1,197 @@
+import os
+import time
+import math
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import Form, Header, HTTPException, Request
+from pymongo import ReturnDocument
+
+from database import get_database
+from services.idempotency_service import is_completed
+
+logger = logging.getLogger(__name__)
+
+# "memory" is per process; "mongo" shares buckets between workers and nodes
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "10000"))
+
+
+def parse_limit(value: str) -> Tuple[int, float]:
+    """'10/60' -> burst of 10 tokens refilled over 60 seconds."""
+    count, _, seconds = value.partition("/")
+    capacity = int(count)
+    return capacity, capacity / float(seconds or 60)
+
+
+# Route class -> budgets keyed by user_id and by client IP
+RATE_LIMITS = {
+    "chat_audio": {
+        "user": parse_limit(os.getenv("RATE_LIMIT_CHAT_AUDIO_USER", "6/60")),
+        "ip": parse_limit(os.getenv("RATE_LIMIT_CHAT_AUDIO_IP", "20/60")),
+    },
+    "chat_text": {
+        "user": parse_limit(os.getenv("RATE_LIMIT_CHAT_TEXT_USER", "20/60")),
+        "ip": parse_limit(os.getenv("RATE_LIMIT_CHAT_TEXT_IP", "60/60")),
+    },
+}
+
+
+class RateLimitResult:
+    def __init__(self, allowed: bool, limit: int, remaining: float, rate: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = max(0, math.floor(remaining))
+        # Seconds until the bucket is full again / until one token is available
+        self.reset = math.ceil((limit - remaining) / rate) if remaining < limit else 0
+        self.retry_after = 0 if allowed else max(1, math.ceil((1 - remaining) / rate))
+
+
+class InMemoryBucketStore:
+    """
+    Token buckets in an LRU-ordered dict. A bucket idle long enough to have
+    refilled completely is equivalent to no bucket, so it is evicted.
+    """
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        # key -> (tokens, last update, seconds to refill completely)
+        self.buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _evict(self, now: float):
+        while self.buckets:
+            key, (_, updated, full_after) = next(iter(self.buckets.items()))
+            if now - updated < full_after and len(self.buckets) <= self.max_buckets:
+                break
+            self.buckets.popitem(last=False)
+
+    async def consume(self, key: str, capacity: int, rate: float) -> RateLimitResult:
+        now = time.monotonic()
+        tokens, updated, _ = self.buckets.pop(key, (capacity, now, 0))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[key] = (tokens, now, capacity / rate)
+        self._evict(now)
+        return RateLimitResult(allowed, capacity, tokens, rate)
+
+    async def refund(self, key: str, capacity: int, rate: float) -> None:
+        if key in self.buckets:
+            tokens, updated, full_after = self.buckets[key]
+            self.buckets[key] = (min(capacity, tokens + 1), updated, full_after)
+
+
+class MongoBucketStore:
+    """Token buckets updated atomically in MongoDB; idle buckets expire via TTL index."""
+
+    def _collection(self):
+        return get_database()["rate_limits"]
+
+    async def consume(self, key: str, capacity: int, rate: float) -> RateLimitResult:
+        elapsed = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, 1000]}
+        pipeline = [
+            {"$set": {
+                "tokens": {"$min": [capacity, {"$add": [
+                    {"$ifNull": ["$tokens", capacity]},
+                    {"$multiply": [elapsed, rate]},
+                ]}]},
+                "updated_at": "$$NOW",
+            }},
+            {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+            {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}},
+        ]
+        doc = await self._collection().find_one_and_update(
+            {"_id": key},
+            pipeline,
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return RateLimitResult(doc["allowed"], capacity, doc["tokens"], rate)
+
+    async def refund(self, key: str, capacity: int, rate: float) -> None:
+        await self._collection().update_one(
+            {"_id": key},
+            [{"$set": {"tokens": {"$min": [capacity, {"$add": ["$tokens", 1]}]}}}],
+        )
+
+
+_store = None
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        _store = MongoBucketStore() if RATE_LIMIT_BACKEND == "mongo" else InMemoryBucketStore()
+    return _store
+
+
+def rate_limit_headers(result: RateLimitResult) -> dict:
+    headers = {
+        "RateLimit-Limit": str(result.limit),
+        "RateLimit-Remaining": str(result.remaining),
+        "RateLimit-Reset": str(result.reset),
+    }
+    if not result.allowed:
+        headers["Retry-After"] = str(result.retry_after)
+    return headers
+
+
+async def check_rate_limit(route_class: str, user_id: Optional[str], ip: Optional[str]) -> RateLimitResult:
+    """
+    Consume one token from each applicable bucket; the first rejection wins
+    and the tokens already taken from the other buckets are given back, so
+    a request refused by its IP budget does not cost the user's.
+    """
+    store = get_bucket_store()
+    tightest = None
+    consumed = []
+    for scope, ident in (("user", user_id), ("ip", ip)):
+        if not ident:
+            continue
+        key = f"{route_class}:{scope}:{ident}"
+        capacity, rate = RATE_LIMITS[route_class][scope]
+        try:
+            result = await store.consume(key, capacity, rate)
+        except Exception as e:
+            # A broken shared store must not take the chat endpoints down with it
+            logger.warning("Rate limiter unavailable: %s", e)
+            continue
+        if not result.allowed:
+            for spent in consumed:
+                try:
+                    await store.refund(*spent)
+                except Exception as e:
+                    logger.warning("Rate limiter refund failed: %s", e)
+            return result
+        consumed.append((key, capacity, rate))
+        if tightest is None or result.remaining < tightest.remaining:
+            tightest = result
+    return tightest
+
+
+def rate_limit(route_class: str, idempotency_scope: Optional[str] = None):
+    """
+    FastAPI dependency enforcing the ``route_class`` budgets. Headers of an
+    allowed request are left in request.state for RateLimitHeadersMiddleware,
+    since handlers often return their own Response objects. Retries that
+    will be replayed from ``idempotency_scope`` are not charged.
+    """
+
+    async def dependency(
+        request: Request,
+        user_id: Optional[str] = Form(None),
+        idempotency_key: Optional[str] = Header(None),
+    ):
+        if idempotency_scope and await is_completed(idempotency_key, idempotency_scope, user_id):
+            return
+        ip = request.client.host if request.client else None
+        result = await check_rate_limit(route_class, user_id, ip)
+        if result is None:
+            return
+        headers = rate_limit_headers(result)
+        if not result.allowed:
+            raise HTTPException(status_code=429, detail="Too many requests", headers=headers)
+        request.state.rate_limit_headers = headers
+
+    return dependency
@@ -0,0 +1,214 @@
+import os
+import json
+import uuid
+import zlib
+import logging
+import asyncio
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+from bson import Binary, ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib ships with Python
+    zstandard = None
+
+# Messages older than this move to compressed archives (0 disables retention)
+MESSAGE_RETENTION_DAYS = int(os.getenv("MESSAGE_RETENTION_DAYS", "0"))
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "24"))
+# Messages per archive document; keeps documents far below the 16MB BSON limit
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+RETENTION_LOCK = "message_retention"
+# The lease is renewed after every archived batch, so it only needs to
+# outlive one batch; a crashed worker's lease lapses after this long.
+RETENTION_LEASE = timedelta(minutes=10)
+
+_scheduler: Optional[asyncio.Task] = None
+
+
+def get_archive_collection(workload: Optional[str] = None):
+    """Safely get the MongoDB message archive collection after startup."""
+    db = get_database(workload)
+    return db["message_archives"]
+
+
+def compress(data: bytes) -> tuple:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd archives")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def to_json_line(doc: dict) -> str:
+    """One message as an NDJSON line with string ids and ISO timestamps."""
+    return json.dumps({
+        "id": str(doc["_id"]),
+        "user_id": doc["user_id"],
+        "sender": doc["sender"],
+        "message": doc["message"],
+        "session_id": doc.get("session_id"),
+        "timestamp": doc["timestamp"].isoformat(),
+    }, ensure_ascii=False)
+
+
+class LeaseLost(Exception):
+    """Another worker took over the retention lease."""
+
+
+async def _acquire_lock(owner: str, ttl: timedelta) -> bool:
+    """Lease lock so only one worker in the deployment archives at a time."""
+    locks = get_database()["job_locks"]
+    now = datetime.utcnow()
+    try:
+        await locks.find_one_and_update(
+            {"_id": RETENTION_LOCK, "locked_until": {"$lt": now}},
+            {"$set": {"locked_until": now + ttl, "owner": owner}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def _renew_lock(owner: str, ttl: timedelta) -> None:
+    res = await get_database()["job_locks"].update_one(
+        {"_id": RETENTION_LOCK, "owner": owner},
+        {"$set": {"locked_until": datetime.utcnow() + ttl}},
+    )
+    if res.matched_count == 0:
+        raise LeaseLost()
+
+
+async def _release_lock(owner: str) -> None:
+    # Only our own lease: after a takeover the lock belongs to someone else
+    await get_database()["job_locks"].update_one(
+        {"_id": RETENTION_LOCK, "owner": owner},
+        {"$set": {"locked_until": datetime.utcnow()}},
+    )
+
+
+async def _archive_batch(user_id: str, docs: list) -> None:
+    messages = get_database()["messages"]
+    sessions = get_database()["sessions"]
+
+    payload = "\n".join(to_json_line(d) for d in docs).encode()
+    codec, data = compress(payload)
+    await get_archive_collection().insert_one({
+        "user_id": user_id,
+        "from_ts": docs[0]["timestamp"],
+        "to_ts": docs[-1]["timestamp"],
+        "count": len(docs),
+        "codec": codec,
+        "data": Binary(data),
+        "created_at": datetime.utcnow(),
+    })
+    # Insert before delete: a crash in between leaves duplicates that
+    # iter_user_messages drops, never lost messages.
+    await messages.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+
+    # Session pages shrink, so their validators (ETags) must change
+    per_session = {}
+    for d in docs:
+        if d.get("session_id") and ObjectId.is_valid(d["session_id"]):
+            per_session[d["session_id"]] = per_session.get(d["session_id"], 0) + 1
+    if per_session:
+        await sessions.bulk_write([
+            UpdateOne({"_id": ObjectId(sid)}, {"$inc": {"archived_count": n}})
+            for sid, n in per_session.items()
+        ], ordered=False)
+
+
+async def archive_old_messages(days: int = MESSAGE_RETENTION_DAYS) -> int:
+    """Move messages older than ``days`` into compressed per-user archives."""
+    if days <= 0:
+        return 0
+    owner = uuid.uuid4().hex
+    if not await _acquire_lock(owner, RETENTION_LEASE):
+        logger.info("Message archiving already running elsewhere, skipping")
+        return 0
+
+    messages = get_database()["messages"]
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archived = 0
+    try:
+        users = messages.aggregate([
+            {"$match": {"timestamp": {"$lt": cutoff}}},
+            {"$group": {"_id": "$user_id"}},
+        ])
+        async for row in users:
+            user_id = row["_id"]
+            batch = []
+            cursor = messages.find({"user_id": user_id, "timestamp": {"$lt": cutoff}}).sort("timestamp", 1)
+            async for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= ARCHIVE_BATCH_SIZE:
+                    await _archive_batch(user_id, batch)
+                    archived += len(batch)
+                    batch = []
+                    await _renew_lock(owner, RETENTION_LEASE)
+            if batch:
+                await _archive_batch(user_id, batch)
+                archived += len(batch)
+                await _renew_lock(owner, RETENTION_LEASE)
+    except LeaseLost:
+        logger.warning("Message archiving lease expired and was taken over, stopping after %d messages", archived)
+        return archived
+    finally:
+        await _release_lock(owner)
+
+    logger.info("Archived %d messages older than %d days", archived, days)
+    return archived
+
+
+async def iter_user_messages(user_id: str, include_archived: bool = True) -> AsyncIterator[dict]:
+    """All of a user's messages in time order: archives first, then the hot collection."""
+    seen = set()
+    if include_archived:
+        cursor = get_archive_collection("export").find({"user_id": user_id}).sort("from_ts", 1)
+        async for archive in cursor:
+            payload = await asyncio.to_thread(decompress, archive["codec"], archive["data"])
+            for line in payload.decode().splitlines():
+                msg = json.loads(line)
+                if msg["id"] not in seen:
+                    seen.add(msg["id"])
+                    yield msg
+
+    cursor = get_database("export")["messages"].find({"user_id": user_id}).sort("timestamp", 1)
+    async for doc in cursor:
+        if str(doc["_id"]) not in seen:
+            yield json.loads(to_json_line(doc))
+
+
+async def _scheduler_loop() -> None:
+    while True:
+        try:
+            await archive_old_messages()
+        except Exception as e:
+            logger.exception("Message archiving failed: %s", e)
+        await asyncio.sleep(RETENTION_INTERVAL_HOURS * 3600)
+
+
+def start_retention_scheduler() -> None:
+    global _scheduler
+    if MESSAGE_RETENTION_DAYS > 0:
+        _scheduler = asyncio.create_task(_scheduler_loop())
+        logger.info("Message retention: archiving after %d days", MESSAGE_RETENTION_DAYS)
+
+
+async def stop_retention_scheduler() -> None:
+    if _scheduler:
+        _scheduler.cancel()
+        await asyncio.gather(_scheduler, return_exceptions=True)
@@ -1,17 +1,30 @@
 from datetime import datetime
 from typing import List, Optional
 from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
 
 from models.session import SessionInDB
 from database import get_database
+from services.http_cache import weak_etag
 
 
-def get_collection():
+SESSION_PREVIEW_LENGTH = 100
+
+
+def get_collection(workload: Optional[str] = None):
     """Safely get the MongoDB sessions collection after startup."""
-    db = get_database()
+    db = get_database(workload)
     return db["sessions"]
 
 
+def make_preview(message: str) -> str:
+    """Short single-line preview of a message for session lists."""
+    preview = " ".join(message.split())
+    if len(preview) > SESSION_PREVIEW_LENGTH:
+        return preview[:SESSION_PREVIEW_LENGTH] + "..."
+    return preview
+
+
 async def create_session(user_id: str, title: str = "New Session") -> SessionInDB:
     col = get_collection()
     now = datetime.utcnow()
@@ -22,6 +35,8 @@ async def create_session(user_id: str, title: str = "New Session") -> SessionInD
         "created_at": now,
         "updated_at": now,
         "is_active": True,
+        "message_count": 0,
+        "last_message_preview": None,
     }
 
     res = await col.insert_one(doc)
@@ -34,7 +49,7 @@ async def create_session(user_id: str, title: str = "New Session") -> SessionInD
 
 
 async def get_user_sessions(user_id: str) -> List[SessionInDB]:
-    col = get_collection()
+    col = get_collection("history")
 
     sessions = []
     cursor = col.find({"user_id": user_id}).sort("updated_at", -1)
@@ -48,6 +63,57 @@ async def get_user_sessions(user_id: str) -> List[SessionInDB]:
     return sessions
 
 
+async def get_latest_session(user_id: str) -> Optional[SessionInDB]:
+    """The user's most recently updated session."""
+    col = get_collection("history")
+
+    doc = await col.find_one({"user_id": user_id}, sort=[("updated_at", -1)])
+    if not doc:
+        return None
+
+    doc["id"] = str(doc["_id"])
+    doc["created_at"] = doc["created_at"].isoformat()
+    doc["updated_at"] = doc["updated_at"].isoformat()
+    return SessionInDB(**doc)
+
+
+async def get_user_sessions_etag(user_id: str) -> str:
+    """Validator for a user's session list from one index-only aggregation."""
+    col = get_collection("history")
+
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": None, "count": {"$sum": 1}, "latest": {"$max": "$updated_at"}}},
+    ]
+    stats = {"count": 0, "latest": None}
+    async for row in col.aggregate(pipeline):
+        stats = row
+    return weak_etag("sessions", user_id, stats["count"], stats["latest"])
+
+
+async def get_session_messages_etag(session_id: str) -> Optional[str]:
+    """Validator for a session's messages, read from its summary fields."""
+    col = get_collection("history")
+
+    if not ObjectId.is_valid(session_id):
+        return None
+
+    doc = await col.find_one(
+        {"_id": ObjectId(session_id)},
+        {"message_count": 1, "archived_count": 1, "last_message_id": 1, "updated_at": 1},
+    )
+    if not doc or "message_count" not in doc:
+        return None
+    return weak_etag(
+        "messages",
+        session_id,
+        doc["message_count"],
+        doc.get("archived_count", 0),
+        doc.get("last_message_id"),
+        doc["updated_at"],
+    )
+
+
 async def get_session_by_id(session_id: str) -> Optional[SessionInDB]:
     col = get_collection()
 
@@ -109,3 +175,78 @@ async def update_session_title_from_message(session_id: str, message: str) -> Op
     title = message[:50] + "..." if len(message) > 50 else message
     
     return await update_session(session_id, {"title": title})
+
+
+async def record_session_message(session_id: str, message_id: ObjectId, sender: str, message: str, timestamp: datetime) -> Optional[dict]:
+    """
+    Keep the session's denormalized summary in step with a newly saved message.
+    Returns the previous summary (last_sender / last_message_at) or None.
+    """
+    col = get_collection()
+
+    if not ObjectId.is_valid(session_id):
+        return None
+
+    return await col.find_one_and_update(
+        {"_id": ObjectId(session_id)},
+        {
+            "$inc": {"message_count": 1},
+            "$set": {
+                "last_message_preview": make_preview(message),
+                "last_message_id": message_id,
+                "last_message_at": timestamp,
+                "last_sender": sender,
+                "updated_at": timestamp,
+            },
+        },
+        projection={"last_sender": 1, "last_message_at": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+
+
+async def backfill_session_summaries(batch_size: int = 500) -> int:
+    """Populate summary fields for sessions created before they existed."""
+    col = get_collection()
+    messages = get_database()["messages"]
+
+    pipeline = [
+        {"$match": {"session_id": {"$ne": None}}},
+        {"$sort": {"timestamp": 1}},
+        {"$group": {
+            "_id": "$session_id",
+            "count": {"$sum": 1},
+            "last_id": {"$last": "$_id"},
+            "last_sender": {"$last": "$sender"},
+            "last_message": {"$last": "$message"},
+            "last_timestamp": {"$last": "$timestamp"},
+        }},
+    ]
+
+    updated = 0
+    ops = []
+    async for row in messages.aggregate(pipeline, allowDiskUse=True):
+        if not ObjectId.is_valid(row["_id"]):
+            continue
+        ops.append(UpdateOne(
+            {"_id": ObjectId(row["_id"])},
+            {"$set": {
+                "message_count": row["count"],
+                "last_message_preview": make_preview(row["last_message"]),
+                "last_message_id": row["last_id"],
+                "last_message_at": row["last_timestamp"],
+                "last_sender": row["last_sender"],
+                "updated_at": row["last_timestamp"],
+            }},
+        ))
+        if len(ops) >= batch_size:
+            updated += (await col.bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        updated += (await col.bulk_write(ops, ordered=False)).modified_count
+
+    # Sessions without any messages
+    res = await col.update_many(
+        {"message_count": {"$exists": False}},
+        {"$set": {"message_count": 0, "last_message_preview": None}},
+    )
+    return updated + res.modified_count
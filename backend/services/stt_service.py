@@ -0,0 +1,81 @@
+import os
+import threading
+import subprocess
+import numpy as np
+import whisper
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "tiny")
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+
+class _WhisperModel:
+    """A lazily loaded Whisper model whose transcribe calls run one at a time."""
+
+    def __init__(self):
+        self.model = None
+        # Whisper installs kv-cache hooks on the shared decoder while decoding,
+        # so concurrent transcribe() calls on one model corrupt each other's output.
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.model is None:
+                self.model = whisper.load_model(WHISPER_MODEL)
+            return self.model
+
+    def transcribe(self, audio, **options) -> dict:
+        model = self.get()
+        with self.lock:
+            return model.transcribe(audio, **options)
+
+
+# Chat turns and batch jobs use separate instances, so a voice reply never
+# queues behind a long upload's chunks. The batch one loads on first use.
+_chat_model = _WhisperModel()
+_batch_model = _WhisperModel()
+
+
+def get_model():
+    """Load the chat Whisper model once per process."""
+    return _chat_model.get()
+
+
+def transcribe(audio, **options) -> dict:
+    """Serialized ``model.transcribe`` for chat turns; blocking, run it off the event loop."""
+    return _chat_model.transcribe(audio, **options)
+
+
+def probe_duration(path: str) -> float:
+    """Duration of an audio file in seconds (requires ffprobe)."""
+    out = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            path,
+        ],
+        capture_output=True,
+        check=True,
+    )
+    return float(out.stdout.decode().strip())
+
+
+def load_audio_segment(path: str, start: float, duration: float) -> np.ndarray:
+    """Decode ``duration`` seconds from ``start`` as 16 kHz mono float32, like whisper.load_audio."""
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-ss", f"{start:.3f}", "-t", f"{duration:.3f}",
+        "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "-",
+    ]
+    out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def transcribe_segment(path: str, start: float, duration: float) -> str:
+    """Transcribe one slice of a file. Blocking; run it off the event loop."""
+    audio = load_audio_segment(path, start, duration)
+    if audio.size == 0:
+        return ""
+    result = _batch_model.transcribe(audio, fp16=False)
+    return result["text"].strip()
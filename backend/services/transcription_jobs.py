@@ -0,0 +1,237 @@
+import os
+import math
+import shutil
+import logging
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from database import get_database
+from services.stt_service import probe_duration, transcribe_segment
+
+logger = logging.getLogger(__name__)
+
+# Workers overlap ffmpeg decoding and DB writes, but all of them share one
+# batch Whisper model (separate from chat's), so each process transcribes one
+# chunk at a time; add processes, not workers, for more transcription throughput.
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "2"))
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "120"))
+TRANSCRIBE_JOBS_DIR = os.getenv("TRANSCRIBE_JOBS_DIR", "transcribe_jobs")
+
+STALE_CLAIM_AFTER = timedelta(minutes=30)
+
+TERMINAL_STATUSES = ("completed", "completed_with_errors", "failed")
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+
+
+def get_jobs_collection():
+    db = get_database()
+    return db["transcription_jobs"]
+
+
+def get_chunks_collection():
+    db = get_database()
+    return db["transcription_chunks"]
+
+
+def job_dir(job_id: str) -> str:
+    return os.path.join(TRANSCRIBE_JOBS_DIR, job_id)
+
+
+def split_chunks(duration: float, chunk_seconds: float = TRANSCRIBE_CHUNK_SECONDS) -> List[tuple]:
+    """(start, duration) pairs covering a file of ``duration`` seconds."""
+    count = max(1, math.ceil(duration / chunk_seconds))
+    return [
+        (i * chunk_seconds, min(chunk_seconds, duration - i * chunk_seconds))
+        for i in range(count)
+    ]
+
+
+async def create_job(job_id: str, user_id: str, files: List[dict]) -> dict:
+    """
+    Register a job for files already written under ``job_dir(job_id)`` and
+    queue its chunks. ``files`` items carry ``filename`` and ``path``.
+    """
+    jobs = get_jobs_collection()
+    chunks = get_chunks_collection()
+    now = datetime.utcnow()
+
+    chunk_docs = []
+    file_docs = []
+    for index, f in enumerate(files):
+        try:
+            duration = await asyncio.to_thread(probe_duration, f["path"])
+        except Exception as e:
+            logger.warning("Could not read %s: %s", f["filename"], e)
+            file_docs.append({"filename": f["filename"], "duration": 0, "error": "Unreadable audio"})
+            continue
+        file_docs.append({"filename": f["filename"], "duration": duration})
+        for chunk_index, (start, length) in enumerate(split_chunks(duration)):
+            chunk_docs.append({
+                "job_id": job_id,
+                "file_index": index,
+                "chunk_index": chunk_index,
+                "path": f["path"],
+                "start": start,
+                "duration": length,
+                "status": "queued",
+                "text": None,
+            })
+
+    job = {
+        "_id": ObjectId(job_id),
+        "user_id": user_id,
+        "status": "queued" if chunk_docs else "failed",
+        "files": file_docs,
+        "chunks_total": len(chunk_docs),
+        "chunks_done": 0,
+        "chunks_failed": 0,
+        "audio_seconds_total": sum(c["duration"] for c in chunk_docs),
+        "audio_seconds_done": 0.0,
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None if chunk_docs else now,
+    }
+    await jobs.insert_one(job)
+
+    if chunk_docs:
+        res = await chunks.insert_many(chunk_docs)
+        for chunk_id, doc in zip(res.inserted_ids, chunk_docs):
+            _queue.put_nowait((chunk_id, doc))
+    else:
+        await asyncio.to_thread(shutil.rmtree, job_dir(job_id), True)
+
+    return job
+
+
+async def _finish_job(job: dict) -> None:
+    """Assemble per-file transcripts once every chunk has settled."""
+    jobs = get_jobs_collection()
+    chunks = get_chunks_collection()
+    job_id = str(job["_id"])
+
+    texts = {}
+    cursor = chunks.find({"job_id": job_id}).sort([("file_index", 1), ("chunk_index", 1)])
+    async for c in cursor:
+        if c.get("text"):
+            texts.setdefault(c["file_index"], []).append(c["text"])
+
+    files = job["files"]
+    for index, f in enumerate(files):
+        f["transcript"] = " ".join(texts.get(index, []))
+
+    status = "completed" if job["chunks_failed"] == 0 else "completed_with_errors"
+    await jobs.update_one(
+        {"_id": job["_id"]},
+        {"$set": {"files": files, "status": status, "finished_at": datetime.utcnow()}},
+    )
+    await asyncio.to_thread(shutil.rmtree, job_dir(job_id), True)
+    logger.info("Transcription job %s %s", job_id, status)
+
+
+async def _process_chunk(chunk_id: ObjectId, chunk: dict) -> None:
+    jobs = get_jobs_collection()
+    chunks = get_chunks_collection()
+    job_oid = ObjectId(chunk["job_id"])
+
+    # Claim atomically so a chunk requeued by several workers runs once
+    claimed = await chunks.find_one_and_update(
+        {"_id": chunk_id, "status": "queued"},
+        {"$set": {"status": "running", "claimed_at": datetime.utcnow()}},
+    )
+    if not claimed:
+        return
+
+    await jobs.update_one(
+        {"_id": job_oid, "started_at": None},
+        {"$set": {"status": "running", "started_at": datetime.utcnow()}},
+    )
+
+    inc = {}
+    try:
+        text = await asyncio.to_thread(transcribe_segment, chunk["path"], chunk["start"], chunk["duration"])
+        await chunks.update_one({"_id": chunk_id}, {"$set": {"status": "done", "text": text}})
+        inc = {"chunks_done": 1, "audio_seconds_done": chunk["duration"]}
+    except Exception as e:
+        logger.warning("Chunk %s of job %s failed: %s", chunk_id, chunk["job_id"], e)
+        await chunks.update_one({"_id": chunk_id}, {"$set": {"status": "failed", "error": str(e)}})
+        inc = {"chunks_failed": 1}
+
+    job = await jobs.find_one_and_update(
+        {"_id": job_oid},
+        {"$inc": inc},
+        return_document=ReturnDocument.AFTER,
+    )
+    if job and job["chunks_done"] + job["chunks_failed"] >= job["chunks_total"]:
+        await _finish_job(job)
+
+
+async def _worker(worker_id: int) -> None:
+    while True:
+        chunk_id, chunk = await _queue.get()
+        try:
+            await _process_chunk(chunk_id, chunk)
+        except Exception as e:
+            logger.exception("Transcription worker %d error: %s", worker_id, e)
+        finally:
+            _queue.task_done()
+
+
+async def start_workers() -> None:
+    """Start the worker pool and requeue chunks left unfinished by a restart."""
+    global _queue
+    _queue = asyncio.Queue()
+
+    chunks = get_chunks_collection()
+    # Chunks whose worker died mid-transcription go back to the queue
+    await chunks.update_many(
+        {"status": "running", "claimed_at": {"$lt": datetime.utcnow() - STALE_CLAIM_AFTER}},
+        {"$set": {"status": "queued"}},
+    )
+
+    cursor = chunks.find({"status": "queued"})
+    async for chunk in cursor:
+        # Inputs live on the node that accepted the upload
+        if os.path.exists(chunk["path"]):
+            _queue.put_nowait((chunk["_id"], chunk))
+
+    for i in range(TRANSCRIBE_WORKERS):
+        _workers.append(asyncio.create_task(_worker(i)))
+    logger.info("Started %d transcription workers", TRANSCRIBE_WORKERS)
+
+
+async def stop_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    if not ObjectId.is_valid(job_id):
+        return None
+    return await get_jobs_collection().find_one({"_id": ObjectId(job_id)})
+
+
+async def get_job_chunks(job_id: str) -> List[dict]:
+    cursor = get_chunks_collection().find(
+        {"job_id": job_id},
+        {"path": 0},
+    ).sort([("file_index", 1), ("chunk_index", 1)])
+    return [c async for c in cursor]
+
+
+def job_throughput(job: dict) -> Optional[float]:
+    """Audio minutes transcribed per wall-clock minute since the job started."""
+    started = job.get("started_at")
+    if not started:
+        return None
+    end = job.get("finished_at") or datetime.utcnow()
+    wall_seconds = (end - started).total_seconds()
+    if wall_seconds <= 0:
+        return None
+    return job["audio_seconds_done"] / wall_seconds
@@ -0,0 +1,154 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from bson import ObjectId
+
+from database import get_database
+from services.ai_service import generate_speech
+from services.audio_storage import build_audio_url
+from services.logging_service import request_id_var
+
+logger = logging.getLogger(__name__)
+
+# Synthesis concurrency, independent of how many requests the server handles
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "2"))
+TTS_QUEUE_SIZE = int(os.getenv("TTS_QUEUE_SIZE", "100"))
+AUDIO_JOB_POLL_SECONDS = 0.5
+# Jobs live only in their process's queue; one still pending after this long
+# belongs to a process that died, so a starting worker fails it
+TTS_STALE_JOB_SECONDS = int(os.getenv("TTS_STALE_JOB_SECONDS", "600"))
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+# Wakes waiters on this process without a database round trip
+_events: Dict[str, asyncio.Event] = {}
+
+
+def get_collection():
+    """Safely get the MongoDB audio job collection after startup."""
+    db = get_database()
+    return db["audio_jobs"]
+
+
+async def enqueue_speech(text: str) -> str:
+    """Queue ``text`` for synthesis and return its audio_id immediately."""
+    col = get_collection()
+    audio_id = str(ObjectId())
+    doc = {
+        "_id": audio_id,
+        "status": PENDING,
+        "audio_url": None,
+        "created_at": datetime.utcnow(),
+    }
+    await col.insert_one(doc)
+
+    _events[audio_id] = asyncio.Event()
+    try:
+        # Workers log under the ID of the request that queued the text
+        _queue.put_nowait((audio_id, text, request_id_var.get()))
+    except asyncio.QueueFull:
+        _events.pop(audio_id, None)
+        await col.update_one({"_id": audio_id}, {"$set": {"status": FAILED, "error": "TTS queue is full"}})
+    return audio_id
+
+
+async def _synthesize(audio_id: str, text: str) -> None:
+    col = get_collection()
+    try:
+        audio_name = await generate_speech(text)
+        update = {"status": READY, "audio_url": build_audio_url(audio_name)}
+    except Exception as e:
+        logger.warning("Deferred TTS for %s failed: %s", audio_id, e)
+        update = {"status": FAILED, "error": "Speech synthesis failed"}
+
+    update["finished_at"] = datetime.utcnow()
+    await col.update_one({"_id": audio_id}, {"$set": update})
+
+    event = _events.pop(audio_id, None)
+    if event:
+        event.set()
+
+
+async def _worker(worker_id: int) -> None:
+    while True:
+        audio_id, text, request_id = await _queue.get()
+        request_id_var.set(request_id)
+        try:
+            await _synthesize(audio_id, text)
+        except Exception as e:
+            logger.exception("TTS worker %d error: %s", worker_id, e)
+        finally:
+            _queue.task_done()
+
+
+async def _fail_jobs(query: dict, error: str) -> int:
+    query = {**query, "status": PENDING}
+    update = {"$set": {"status": FAILED, "error": error, "finished_at": datetime.utcnow()}}
+    result = await get_collection().update_many(query, update)
+    return result.modified_count
+
+
+async def start_workers() -> None:
+    global _queue
+    stale = await _fail_jobs(
+        {"created_at": {"$lt": datetime.utcnow() - timedelta(seconds=TTS_STALE_JOB_SECONDS)}},
+        "Speech synthesis was interrupted by a restart",
+    )
+    if stale:
+        logger.warning("Marked %d stale TTS jobs as failed", stale)
+
+    _queue = asyncio.Queue(maxsize=TTS_QUEUE_SIZE)
+    for i in range(TTS_WORKERS):
+        _workers.append(asyncio.create_task(_worker(i)))
+    logger.info("Started %d TTS workers", TTS_WORKERS)
+
+
+async def stop_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+    # Queued and in-flight jobs die with this process; tell their pollers now
+    unfinished = list(_events)
+    if unfinished:
+        await _fail_jobs({"_id": {"$in": unfinished}}, "Speech synthesis was interrupted by a restart")
+        for audio_id in unfinished:
+            _events.pop(audio_id).set()
+        logger.info("Marked %d unfinished TTS jobs as failed", len(unfinished))
+
+
+async def get_audio_job(audio_id: str) -> Optional[dict]:
+    return await get_collection().find_one({"_id": audio_id})
+
+
+async def wait_for_audio(audio_id: str, timeout: float) -> Optional[dict]:
+    """
+    Return the audio job once it leaves PENDING or ``timeout`` expires.
+    Jobs queued on another worker are followed by polling Mongo.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        job = await get_audio_job(audio_id)
+        if job is None or job["status"] != PENDING:
+            return job
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return job
+
+        event = _events.get(audio_id)
+        wait = remaining if event is not None else min(remaining, AUDIO_JOB_POLL_SECONDS)
+        try:
+            if event is not None:
+                await asyncio.wait_for(event.wait(), wait)
+            else:
+                await asyncio.sleep(wait)
+        except asyncio.TimeoutError:
+            pass
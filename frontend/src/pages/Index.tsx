@@ -13,6 +13,7 @@ import {
   sendTextMessage, 
   sendAudioMessage, 
   getUserSessions,
+  getBootstrap,
   createSession,
   getSessionMessages,
   deleteSession,
@@ -70,10 +71,10 @@ const Index = () => {
   const animationFrameRef = useRef<number | null>(null);
   const scrollAreaRef = useRef<HTMLDivElement | null>(null);
 
-  // Load sessions when user is set
+  // Load sessions and reopen the latest conversation when user is set
   useEffect(() => {
     if (user) {
-      loadSessions();
+      loadInitialState();
     }
   }, [user]);
 
@@ -84,6 +85,31 @@ const Index = () => {
     }
   }, [messages]);
 
+  const loadInitialState = async () => {
+    if (!user) return;
+    try {
+      setSessionsLoading(true);
+      const data = await getBootstrap(user.id);
+      setSessions(data.sessions);
+      if (data.active_session_id && data.messages.length > 0) {
+        setCurrentSessionId(data.active_session_id);
+        setMessages(
+          data.messages.map((msg: ApiMessage, index: number) => ({
+            id: index + 1,
+            role: msg.role,
+            content: msg.content,
+          }))
+        );
+        setChatMode("text");
+      }
+    } catch (error) {
+      console.error("Error loading sessions:", error);
+    } finally {
+      setSessionsLoading(false);
+    }
+  };
+
+  // Refreshes only the session list, e.g. after a turn updates titles and previews
   const loadSessions = async () => {
     if (!user) return;
     try {
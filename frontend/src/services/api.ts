@@ -35,6 +35,8 @@ export interface Session {
   created_at: string;
   updated_at: string;
   is_active: boolean;
+  message_count: number;
+  last_message_preview?: string | null;
 }
 
 // Send text message to the AI (text only, no audio)
@@ -181,6 +183,37 @@ export async function getSessionMessages(sessionId: string): Promise<Message[]>
   }));
 }
 
+export interface BootstrapData {
+  sessions: Session[];
+  active_session_id: string | null;
+  messages: Message[];
+  has_more_messages: boolean;
+}
+
+// Load sessions plus the latest session's most recent messages in one request
+export async function getBootstrap(userId: string): Promise<BootstrapData> {
+  const response = await fetch(`${API_BASE_URL}/bootstrap/${userId}`);
+
+  if (!response.ok) {
+    throw new Error("Failed to load user data");
+  }
+
+  const data = await response.json();
+  return {
+    sessions: data.sessions,
+    active_session_id: data.active_session_id,
+    has_more_messages: data.has_more_messages,
+    messages: (data.messages as BackendMessage[]).map((msg) => ({
+      id: msg.id,
+      user_id: msg.user_id,
+      role: msg.sender,
+      content: msg.message,
+      timestamp: msg.timestamp,
+      session_id: msg.session_id,
+    })),
+  };
+}
+
 // Session API functions
 export async function createSession(userId: string, title: string = "New Session"): Promise<Session> {
   const response = await fetch(`${API_BASE_URL}/sessions`, {